@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_after", "locked_by", "created_at")
+    list_filter = ("status", "name")
+    search_fields = ("=dedupe_key",)
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created_at")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.filter(status=Job.FAILED).update(
+            status=Job.PENDING, attempts=0, run_after=timezone.now(), locked_by="", locked_at=None
+        )
+        self.message_user(request, f"{updated} failed jobs queued again")
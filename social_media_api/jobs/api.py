@@ -0,0 +1,64 @@
+"""
+Registering and enqueueing background jobs.
+
+    # posts/jobs.py
+    from jobs.api import job
+
+    @job("posts.record_interaction")
+    def record_interaction(interaction_id):
+        ...
+
+    # in a mutation
+    enqueue("posts.record_interaction", {"interaction_id": interaction.pk})
+
+Handlers take their payload as keyword arguments, so payloads must be
+JSON-serializable dicts (pass UUIDs as strings).
+"""
+from django.conf import settings
+from django.db import transaction
+
+registry = {}
+
+
+def job(name, max_attempts=5):
+    """Register the decorated function as the handler for jobs called name."""
+    def decorator(func):
+        if name in registry and registry[name] is not func:
+            raise ValueError(f"Job {name!r} is already registered")
+        func.job_name = name
+        func.max_attempts = max_attempts
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, dedupe_key=None, run_after=None):
+    """
+    Queue a job once the surrounding transaction commits (immediately in
+    autocommit mode), so workers never see work for data that was rolled
+    back. If a pending job already has the same dedupe_key the new one is
+    dropped. With JOBS_EAGER the handler runs inline after
+    commit instead, which is handy in development and tests.
+    """
+    if name not in registry:
+        raise ValueError(f"Unknown job {name!r}")
+    payload = payload or {}
+
+    if getattr(settings, "JOBS_EAGER", False):
+        transaction.on_commit(lambda: registry[name](**payload))
+        return
+
+    from .models import Job
+
+    def insert():
+        fields = {
+            "name": name,
+            "payload": payload,
+            "dedupe_key": dedupe_key,
+            "max_attempts": registry[name].max_attempts,
+        }
+        if run_after is not None:
+            fields["run_after"] = run_after
+        Job.objects.bulk_create([Job(**fields)], ignore_conflicts=dedupe_key is not None)
+
+    transaction.on_commit(insert)
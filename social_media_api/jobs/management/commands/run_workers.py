@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import work
+
+
+def worker_process(worker_id, batch_size, poll_interval, stop, once):
+    # the parent handles Ctrl-C and tells us to stop through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()  # no-op when forked, needed with the spawn start method
+    try:
+        work(worker_id, batch_size=batch_size, poll_interval=poll_interval, stop=stop, once=once)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background job workers: a pool of processes that claim jobs "
+        "from the jobs_job table in batches and run their handlers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once no runnable jobs are left")
+
+    def handle(self, *args, **options):
+        # children inherit the parent's memory; don't let them share its
+        # database connections
+        connections.close_all()
+        stop = multiprocessing.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        processes = [
+            multiprocessing.Process(
+                target=worker_process,
+                args=(f"{prefix}:{n}", options["batch_size"], options["poll_interval"], stop, options["once"]),
+                daemon=True,
+            )
+            for n in range(options["processes"])
+        ]
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping workers after their current batch...")
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} workers ({prefix})")
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
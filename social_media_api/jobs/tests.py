@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .api import enqueue, job
+from .models import Job
+from .worker import claim, run_job
+
+calls = []
+
+
+@job("jobs.tests.record")
+def record(value):
+    calls.append(value)
+
+
+@job("jobs.tests.fail", max_attempts=2)
+def fail(**payload):
+    raise RuntimeError("boom")
+
+
+class EnqueueTests(TestCase):
+    def test_inserted_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            enqueue("jobs.tests.record", {"value": 1})
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(Job.objects.get().payload, {"value": 1})
+
+    def test_nothing_queued_when_rolled_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    enqueue("jobs.tests.record", {"value": 1})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_dedupe_key_only_matches_pending_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("jobs.tests.record", {"value": 1}, dedupe_key="k")
+            enqueue("jobs.tests.record", {"value": 2}, dedupe_key="k")
+        self.assertEqual(Job.objects.count(), 1)
+
+        # a running job may have read stale data, so a new duplicate is kept
+        Job.objects.update(status=Job.RUNNING, locked_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("jobs.tests.record", {"value": 3}, dedupe_key="k")
+        self.assertEqual(
+            sorted(Job.objects.values_list("status", "payload__value")),
+            [(Job.PENDING, 3), (Job.RUNNING, 1)],
+        )
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            enqueue("jobs.tests.missing")
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_the_handler_after_commit(self):
+        calls.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("jobs.tests.record", {"value": 1})
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+
+class WorkerTests(TestCase):
+    def make_jobs(self, n, name="jobs.tests.record", **fields):
+        return [Job.objects.create(name=name, payload={"value": i}, **fields) for i in range(n)]
+
+    def make_runnable(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_batches_without_double_claiming(self):
+        self.make_jobs(5)
+        first = claim("w1", batch_size=2)
+        second = claim("w2", batch_size=10)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 3)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(claim("w3", batch_size=10), [])
+        for job in first + second:
+            self.assertEqual((job.status, job.attempts), (Job.RUNNING, 1))
+
+    def test_claim_skips_jobs_not_due(self):
+        self.make_jobs(1, run_after=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(claim("w1", batch_size=10), [])
+
+    def test_success_deletes_the_job(self):
+        calls.clear()
+        self.make_jobs(1)
+        (job,) = claim("w1", batch_size=10)
+        self.assertTrue(run_job(job))
+        self.assertEqual(calls, [0])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failure_is_retried_with_backoff(self):
+        self.make_jobs(1, name="jobs.tests.fail", max_attempts=2)
+        (job,) = claim("w1", batch_size=10)
+        before = timezone.now()
+        with self.assertLogs("jobs.worker", "WARNING"):
+            self.assertFalse(run_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.PENDING, 1, ""))
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=2))
+        self.assertEqual(claim("w1", batch_size=10), [])
+
+    def test_failed_after_max_attempts(self):
+        (job,) = self.make_jobs(1, name="jobs.tests.fail", max_attempts=2)
+        for _ in range(2):
+            self.make_runnable(job)
+            (claimed,) = claim("w1", batch_size=10)
+            with self.assertLogs("jobs.worker", "WARNING"):
+                run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.make_runnable(job)
+        self.assertEqual(claim("w1", batch_size=10), [])
+
+    @override_settings(JOBS_LEASE_SECONDS=60)
+    def test_expired_lease_is_claimed_again(self):
+        now = timezone.now()
+        expired, fresh = self.make_jobs(2, status=Job.RUNNING, attempts=1, locked_by="dead")
+        Job.objects.filter(pk=expired.pk).update(locked_at=now - timedelta(seconds=61))
+        Job.objects.filter(pk=fresh.pk).update(locked_at=now)
+
+        (reclaimed,) = claim("w2", batch_size=10)
+        self.assertEqual(reclaimed.pk, expired.pk)
+        self.assertEqual(reclaimed.attempts, 2)
+        self.assertTrue(reclaimed.locked_by.startswith("w2:"))
+
+        # the dead worker can no longer complete or fail the job it lost
+        expired.refresh_from_db()
+        expired.locked_by = "dead"
+        run_job(expired)
+        self.assertTrue(Job.objects.filter(pk=expired.pk, locked_by=reclaimed.locked_by).exists())
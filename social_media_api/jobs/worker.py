@@ -0,0 +1,110 @@
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q, Subquery
+from django.utils import timezone
+
+from .api import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def runnable_jobs(now):
+    # RUNNING jobs whose lease expired belong to a worker that died
+    lease = timedelta(seconds=getattr(settings, "JOBS_LEASE_SECONDS", 300))
+    return Job.objects.filter(
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=now - lease)
+    ).order_by("run_after", "id")
+
+
+def claim(worker_id, batch_size):
+    """
+    Atomically mark up to batch_size runnable jobs as ours and return them.
+
+    On PostgreSQL (and other backends with SKIP LOCKED) candidate rows are
+    locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    claim disjoint batches without waiting on each other. SQLite has no row
+    locks; there the claim is a single UPDATE ... WHERE id IN (SELECT ...
+    LIMIT n), which SQLite runs under its database write lock.
+    """
+    now = timezone.now()
+    token = f"{worker_id}:{uuid.uuid4().hex[:12]}"
+    claimed = dict(status=Job.RUNNING, locked_by=token, locked_at=now, attempts=F("attempts") + 1)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                runnable_jobs(now).select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        candidates = runnable_jobs(now).values("id")[:batch_size]
+        if not Job.objects.filter(id__in=Subquery(candidates)).update(**claimed):
+            return []
+
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING))
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(2 ** attempts, 3600))
+
+
+def run_job(job):
+    handler = registry.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job.name!r}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s failed permanently after %s attempts:\n%s", job, job.attempts, error)
+            Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+                status=Job.FAILED, last_error=error
+            )
+        else:
+            logger.warning("Job %s failed (attempt %s), retrying:\n%s", job, job.attempts, error)
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+                        status=Job.PENDING, last_error=error, locked_by="", locked_at=None,
+                        run_after=timezone.now() + backoff(job.attempts),
+                    )
+            except IntegrityError:
+                # a duplicate was queued while we ran; it supersedes this one
+                Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    return True
+
+
+def work(worker_id, batch_size=20, poll_interval=1.0, stop=None, once=False):
+    """
+    Claim and run batches until stop (a threading/multiprocessing Event) is
+    set, or with once=True until no runnable jobs are left.
+    """
+    processed = 0
+    while stop is None or not stop.is_set():
+        jobs = claim(worker_id, batch_size)
+        if not jobs:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        for job in jobs:
+            run_job(job)
+            processed += 1
+    return processed
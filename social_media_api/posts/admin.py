@@ -1,25 +1,204 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from .hashtags import normalize_tag
 from .models import Post, Comment, Interaction
+from .purge import soft_delete_posts
+from .counters import promote
 # Register your models here.
 
 
+def estimated_row_count(queryset):
+    """The table's row count from cheap statistics; None if there are none."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables"
+                " WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            # rowids grow by one per insert, so the largest is close enough
+            cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists of big tables. An unfiltered list shows an
+    estimated total instead of running COUNT(*) over the whole table, and a
+    filtered one stops counting at count_limit rows.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None:
+                return estimate
+        # COUNT(*) over a LIMITed subquery
+        return queryset.order_by()[: self.count_limit].count()
+
+
+KEYSET_VAR = "older_than"
+
+
+class ScalableAdminMixin:
+    """
+    Changelist settings for tables with millions of rows: estimated counts,
+    and an "Older" link that continues after the last row shown, so deep
+    pages are an index seek instead of an ever larger OFFSET. The link
+    carries the last row's (keyset_field, pk) as ?older_than=<value>|<pk>,
+    so rows sharing the boundary value aren't skipped. The list must be
+    ordered by -keyset_field (the changelist adds -pk), and keyset_field
+    should be indexed.
+    """
+    keyset_field = "created_at"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/keyset_change_list.html"
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        cursor = getattr(request, "keyset_cursor", None)
+        if cursor is None:
+            return queryset
+        value, _, pk = cursor.rpartition("|")
+        field = self.keyset_field
+        try:
+            # the <= bound is the index range; ties go on to the pk
+            return queryset.filter(**{f"{field}__lte": value}).filter(
+                Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+            )
+        except (ValidationError, ValueError):
+            raise IncorrectLookupParameters(f"Invalid {KEYSET_VAR} cursor")
+
+    def changelist_view(self, request, extra_context=None):
+        # the cursor isn't a field lookup, so the changelist mustn't see it
+        if KEYSET_VAR in request.GET:
+            params = request.GET.copy()
+            request.keyset_cursor = params.pop(KEYSET_VAR)[-1]
+            request.GET = params
+        response = super().changelist_view(request, extra_context)
+        cl = getattr(response, "context_data", {}).get("cl")
+        # column sorting changes the order, so the keyset link would skip rows
+        if cl is None or ORDER_VAR in cl.params:
+            return response
+        # evaluates the page once; the template reuses the cached rows
+        rows = list(cl.result_list)
+        if len(rows) < cl.list_per_page:
+            return response
+        last = getattr(rows[-1], self.keyset_field)
+        value = last.isoformat() if hasattr(last, "isoformat") else last
+        response.context_data["keyset_next_url"] = cl.get_query_string(
+            {KEYSET_VAR: f"{value}|{rows[-1].pk}"}, remove=[PAGE_VAR]
+        )
+        return response
+
+
+class SoftDeleteAdminMixin:
+    """
+    Deleting from the admin sets deleted_at and queues a batched purge
+    instead of running Django's collector, which would load every dependent
+    row, even just to list them on the confirmation page.
+    """
+    soft_delete = None  # staticmethod taking a queryset
+
+    def get_deleted_objects(self, objs, request):
+        opts = self.model._meta
+        objs = list(objs)
+        to_delete = [f"{capfirst(opts.verbose_name)}: {obj}" for obj in objs]
+        model_count = {opts.verbose_name_plural: len(objs)}
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        return to_delete, model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
+
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(SoftDeleteAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "author", "content", "created_at", "likes_count", "comments_count", "shares_count")
-    search_fields = ("content", "author__username")
-    list_filter = ("created_at",)
+    list_select_related = ("author",)
+    search_fields = ("content",)
+    search_help_text = "#tag, @username, or text in the content (slow on big tables)"
+    list_filter = ("created_at", ("deleted_at", admin.EmptyFieldListFilter))
+    raw_id_fields = ("author",)
+    readonly_fields = ("deleted_at", "sharded_counters")
+    soft_delete = staticmethod(soft_delete_posts)
+    actions = ["shard_counters"]
+
+    @admin.action(description="Shard counters of selected posts (for expected traffic spikes)")
+    def shard_counters(self, request, queryset):
+        pks = list(queryset.values_list("pk", flat=True))
+        for pk in pks:
+            promote(pk)
+        self.message_user(request, f"Counters of {len(pks)} posts are sharded until they cool down")
+
+    def get_search_results(self, request, queryset, search_term):
+        # "#tag" and "@username" are index lookups; anything else scans content
+        term = search_term.strip()
+        if term.startswith("#"):
+            return queryset.filter(tags__tag=normalize_tag(term)), False
+        if term.startswith("@"):
+            return queryset.filter(author__username=term[1:]), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def save_model(self, request, obj, form, change):
+        # lets changesSince send the new content to clients
+        if change and "content" in form.changed_data:
+            obj.content_updated_at = timezone.now()
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "author", "post", "content", "created_at")
-    search_fields = ("content", "author__username")
+    # str(post) shows the post's author too
+    list_select_related = ("author", "post__author")
+    ordering = ("-created_at",)
+    search_fields = ("content",)
+    search_help_text = "@username, or text in the content (slow on big tables)"
     list_filter = ("created_at",)
+    raw_id_fields = ("post", "author")
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term.startswith("@"):
+            return queryset.filter(author__username=term[1:]), False
+        return super().get_search_results(request, queryset, search_term)
 
 
 @admin.register(Interaction)
-class InteractionAdmin(admin.ModelAdmin):
+class InteractionAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("id", "user", "post", "type", "created_at")
+    list_select_related = ("user", "post__author")
+    # ids increase with created_at and need no extra index
+    ordering = ("-id",)
+    keyset_field = "id"
     list_filter = ("type", "created_at")
-    search_fields = ("user__username", "post__content")
+    search_fields = ("user__username__exact",)
+    search_help_text = "Exact username"
+    raw_id_fields = ("post", "user")
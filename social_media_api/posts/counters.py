@@ -0,0 +1,169 @@
+"""
+Sharded counters for hot posts.
+
+Every like, share and comment increments a counter on the post row, so the
+writes for a viral post all queue on one row lock. Once a post takes
+POST_COUNTER_HOT_WRITES counter writes within POST_COUNTER_HOT_WINDOW_SECONDS
+it switches to sharded mode:
+
+- increments go to one of POST_COUNTER_SHARDS PostCounterShard rows,
+  picked at random
+- reads add the shards to the row, cached for POST_COUNTER_READ_CACHE_SECONDS
+- every POST_COUNTER_FOLD_SECONDS the posts.fold_counter_shards job moves
+  the shard totals into the post row (and the likes into the author's
+  likes_received_count), and switches the post back to row counters once
+  it has cooled down
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from jobs.api import enqueue
+from .models import Post, PostCounterShard
+
+User = get_user_model()
+
+FIELDS = ("likes_count", "shares_count", "comments_count")
+
+
+def shard_count():
+    return getattr(settings, "POST_COUNTER_SHARDS", 8)
+
+
+def hot_writes():
+    return getattr(settings, "POST_COUNTER_HOT_WRITES", 100)
+
+
+def note_write(post):
+    """Count a counter write to a post, and shard the post once it's hot."""
+    threshold = hot_writes()
+    if not threshold:
+        return
+    # every process's writes count towards the same threshold
+    shared = caches[getattr(settings, "POST_COUNTER_CACHE", "shared")]
+    window = getattr(settings, "POST_COUNTER_HOT_WINDOW_SECONDS", 10)
+    key = f"post-writes:{post.pk}:{int(time.time() // window)}"
+    try:
+        writes = shared.incr(key)
+    except ValueError:  # first write in this window
+        shared.add(key, 1, timeout=window * 2)
+        writes = 1
+    # >= rather than ==: incr on the database cache can lose a count to a
+    # race, and promoting an already sharded post is a no-op
+    if writes >= threshold:
+        promote(post.pk)
+
+
+def promote(post_id):
+    """Switch a post to sharded counters (a no-op if it already is)."""
+    PostCounterShard.objects.bulk_create(
+        [PostCounterShard(post_id=post_id, shard=n) for n in range(shard_count())],
+        ignore_conflicts=True,
+    )
+    if Post.objects.filter(pk=post_id, sharded_counters=False).update(sharded_counters=True):
+        schedule_fold(post_id)
+
+
+def schedule_fold(post_id):
+    enqueue(
+        "posts.fold_counter_shards",
+        {"post_id": str(post_id)},
+        dedupe_key=f"posts.fold_counter_shards:{post_id}",
+        run_after=timezone.now() + timedelta(seconds=getattr(settings, "POST_COUNTER_FOLD_SECONDS", 30)),
+    )
+
+
+def bump_shard(post, deltas):
+    """Add deltas to a random shard of post; False if it has no shards (any more)."""
+    updated = PostCounterShard.objects.filter(
+        post_id=post.pk, shard=random.randrange(shard_count())
+    ).update(**{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated:
+        return False
+    # delta sync needs updated_at to move, but stamping it on every write
+    # would bring the hot row back; once per window is enough, and the fold
+    # stamps it again
+    touch_seconds = getattr(settings, "POST_COUNTER_TOUCH_SECONDS", 1)
+    if cache.add(f"post-touched:{post.pk}", 1, timeout=touch_seconds):
+        Post.objects.filter(pk=post.pk).update(updated_at=timezone.now())
+    return True
+
+
+def totals_cache_key(post_id):
+    return f"post-counter-totals:{post_id}"
+
+
+def sharded_totals(post_id, cached=True):
+    """
+    Row plus shard counters of a sharded post. Both are read in one
+    statement, so a concurrent fold can't be counted twice. Shard writes
+    don't clear the cached totals, so paths that report a change right
+    after a write (subscriptions, changesSince) pass cached=False.
+    """
+    key = totals_cache_key(post_id)
+    totals = cache.get(key) if cached else None
+    if totals is None:
+        totals = Post.objects.filter(pk=post_id).values("pk").annotate(**{
+            f"total_{field}": F(field) + Coalesce(Sum(f"counter_shards__{field}"), 0)
+            for field in FIELDS
+        }).first()
+        totals = {field: totals[f"total_{field}"] for field in FIELDS} if totals else {}
+        cache.set(key, totals, timeout=getattr(settings, "POST_COUNTER_READ_CACHE_SECONDS", 1))
+    return totals
+
+
+def counter_value(post, field):
+    """The likes/shares/comments count to show for a Post instance."""
+    if post.sharded_counters:
+        return sharded_totals(post.pk).get(field, getattr(post, field))
+    return getattr(post, field)
+
+
+def fold(post_id):
+    """
+    Move the shards' totals into the post row and the likes into the
+    author's likes_received_count. A post that took fewer than
+    POST_COUNTER_HOT_WRITES writes since the last fold (a longer window
+    than the one that promoted it) goes back to row counters and its shards
+    are deleted. Returns True if it stays sharded.
+    """
+    with transaction.atomic():
+        post = Post.objects.filter(pk=post_id).values("author_id", "deleted_at").first()
+        if post is None:
+            return False
+        shards = list(PostCounterShard.objects.select_for_update().filter(post_id=post_id))
+        totals = {field: sum(getattr(shard, field) for shard in shards) for field in FIELDS}
+        # with automatic sharding off, a manually sharded post stays sharded
+        # for as long as it keeps getting writes
+        stays_sharded = post["deleted_at"] is None and sum(totals.values()) >= (hot_writes() or 1)
+
+        if stays_sharded:
+            for shard in shards:
+                if any(getattr(shard, field) for field in FIELDS):
+                    # subtract what we read rather than zeroing
+                    PostCounterShard.objects.filter(pk=shard.pk).update(
+                        **{field: F(field) - getattr(shard, field) for field in FIELDS}
+                    )
+        else:
+            # writers that find their shard gone fall back to the row
+            PostCounterShard.objects.filter(post_id=post_id).delete()
+
+        Post.objects.filter(pk=post_id).update(
+            sharded_counters=stays_sharded,
+            updated_at=timezone.now(),
+            **{field: F(field) + n for field, n in totals.items() if n},
+        )
+        # deleted posts were already taken off their author's stats
+        if post["deleted_at"] is None and totals["likes_count"]:
+            User(pk=post["author_id"]).bump_counters(likes_received_count=totals["likes_count"])
+
+    cache.delete(totals_cache_key(post_id))
+    return stays_sharded
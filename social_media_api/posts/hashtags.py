@@ -0,0 +1,70 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import PostMention, PostTag
+
+User = get_user_model()
+
+# "#tag" not preceded by a word character, slash or entity marker, so URL
+# fragments and "&#39;" don't count; tags are case-insensitive, and longer
+# than 64 characters aren't tags rather than being cut short
+TAG_RE = re.compile(r"(?<![\w/&#])#(\w{1,64})(?!\w)")
+# "@username" not preceded by a word character, so emails don't count
+MENTION_RE = re.compile(r"(?<![\w@./])@([\w.-]{1,50})(?![\w.-])")
+
+
+def normalize_tag(tag):
+    return tag.lstrip("#").lower()
+
+
+def extract_tags(content):
+    return {normalize_tag(tag) for tag in TAG_RE.findall(content or "")}
+
+
+def extract_mentions(content):
+    # a trailing "." or "-" is punctuation, not part of the username
+    names = (name.rstrip(".-") for name in MENTION_RE.findall(content or ""))
+    return {name for name in names if name}
+
+
+def sync_post_links(posts, replace=True):
+    """
+    Rebuild the PostTag/PostMention rows for the given posts from their
+    content. Works on a batch so the backfill resolves all mentioned
+    usernames with one query; pass replace=False for brand new posts.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+
+    tags = {post.pk: extract_tags(post.content) for post in posts}
+    mentions = {post.pk: extract_mentions(post.content) for post in posts}
+    usernames = set().union(*mentions.values())
+    user_ids = (
+        dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        if usernames else {}
+    )
+
+    tag_rows = [
+        PostTag(post_id=post.pk, tag=tag, created_at=post.created_at)
+        for post in posts
+        for tag in tags[post.pk]
+    ]
+    mention_rows = [
+        PostMention(post_id=post.pk, user_id=user_ids[name], created_at=post.created_at)
+        for post in posts
+        for name in mentions[post.pk]
+        if name in user_ids
+    ]
+    if not (replace or tag_rows or mention_rows):
+        return
+
+    with transaction.atomic():
+        if replace:
+            pks = [post.pk for post in posts]
+            PostTag.objects.filter(post_id__in=pks).delete()
+            PostMention.objects.filter(post_id__in=pks).delete()
+        PostTag.objects.bulk_create(tag_rows, ignore_conflicts=True)
+        PostMention.objects.bulk_create(mention_rows, ignore_conflicts=True)
@@ -0,0 +1,55 @@
+"""Background job handlers for posts, run by `manage.py run_workers`."""
+from django.contrib.auth import get_user_model
+
+from jobs.api import enqueue, job
+
+from . import counters
+from .hashtags import sync_post_links
+from .models import Interaction, Post
+from .purge import purge_post_rows, purge_user_rows
+from . import rollups
+
+User = get_user_model()
+
+
+@job("posts.record_interaction")
+def record_interaction(interaction_id):
+    interaction = Interaction.objects.filter(pk=interaction_id).first()
+    if interaction is None:
+        return  # undone or archived before we got to it
+    rollups.record_interaction(interaction)
+
+
+@job("posts.index_post_links")
+def index_post_links(post_id, replace=True):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    sync_post_links([post], replace=replace)
+
+
+@job("posts.fold_counter_shards")
+def fold_counter_shards(post_id):
+    if counters.fold(post_id):
+        counters.schedule_fold(post_id)
+
+
+# Each run does a bounded amount of work and queues a continuation, so a
+# huge purge never outlives the worker's lease or holds one long transaction.
+PURGE_BATCHES_PER_RUN = 50
+
+
+@job("posts.purge_post")
+def purge_post(post_id):
+    if not Post.objects.filter(pk=post_id, deleted_at__isnull=False).exists():
+        return  # already purged (or never soft-deleted)
+    if not purge_post_rows(post_id, max_batches=PURGE_BATCHES_PER_RUN):
+        enqueue("posts.purge_post", {"post_id": post_id}, dedupe_key=f"posts.purge_post:{post_id}")
+
+
+@job("posts.purge_user")
+def purge_user(user_id):
+    if not User.objects.filter(pk=user_id, deleted_at__isnull=False).exists():
+        return
+    if not purge_user_rows(user_id, max_batches=PURGE_BATCHES_PER_RUN):
+        enqueue("posts.purge_user", {"user_id": user_id}, dedupe_key=f"posts.purge_user:{user_id}")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import ArchivedInteraction, Interaction
+from posts.rollups import retention_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move raw interactions older than INTERACTION_RETENTION_DAYS into "
+        "ArchivedInteraction in small batches. Post counters and the daily "
+        "rollup are unaffected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many interactions would be archived",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff()
+        if cutoff is None:
+            raise CommandError("INTERACTION_RETENTION_DAYS is not set; nothing to archive.")
+
+        expired = Interaction.objects.filter(created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"{expired.count()} interactions older than {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    expired.order_by("created_at")
+                    .values_list("id", "post_id", "user_id", "type", "created_at")[: options["batch_size"]]
+                )
+                if not batch:
+                    break
+                ArchivedInteraction.objects.bulk_create(
+                    [
+                        ArchivedInteraction(
+                            id=id, post_id=post_id, user_id=user_id,
+                            type=type, created_at=created_at,
+                        )
+                        for id, post_id, user_id, type, created_at in batch
+                    ],
+                    ignore_conflicts=True,
+                )
+                Interaction.objects.filter(id__in=[row[0] for row in batch]).delete()
+            moved += len(batch)
+            self.stdout.write(f"archived {moved} interactions...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} interactions older than {cutoff:%Y-%m-%d}"))
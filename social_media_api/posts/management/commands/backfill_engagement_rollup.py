@@ -0,0 +1,82 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from posts.models import ArchivedInteraction, DailyPostEngagement, Interaction
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild DailyPostEngagement from raw and archived interactions, one "
+        "day at a time. Run once before enabling INTERACTION_RETENTION_DAYS; "
+        "afterwards InteractWithPost keeps the rollup current."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=str, help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--until", type=str, help="Last day to rebuild (YYYY-MM-DD)")
+
+    def parse_day(self, value):
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Invalid day {value!r}, expected YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        since = options["since"] and self.parse_day(options["since"])
+        until = options["until"] and self.parse_day(options["until"])
+
+        if not since or not until:
+            bounds = [
+                model.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+                for model in (Interaction, ArchivedInteraction)
+            ]
+            firsts = [b["first"] for b in bounds if b["first"]]
+            lasts = [b["last"] for b in bounds if b["last"]]
+            if not firsts:
+                self.stdout.write("No interactions to roll up.")
+                return
+            since = since or timezone.localdate(min(firsts))
+            until = until or timezone.localdate(max(lasts))
+
+        day = since
+        total = 0
+        while day <= until:
+            total += self.rebuild_day(day)
+            day += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {total} rollup rows for {since} .. {until}"
+        ))
+
+    def rebuild_day(self, day):
+        start, end = day_bounds(day)
+        counts = Counter()
+        for model in (Interaction, ArchivedInteraction):
+            rows = (
+                model.objects.filter(created_at__gte=start, created_at__lt=end)
+                .order_by()
+                .values_list("post_id", "type")
+                .annotate(n=Count("id"))
+            )
+            for post_id, type, n in rows:
+                counts[(post_id, type)] += n
+
+        with transaction.atomic():
+            DailyPostEngagement.objects.filter(day=day).delete()
+            DailyPostEngagement.objects.bulk_create(
+                [
+                    DailyPostEngagement(day=day, post_id=post_id, type=type, count=n)
+                    for (post_id, type), n in counts.items()
+                ],
+                batch_size=1000,
+            )
+        return len(counts)
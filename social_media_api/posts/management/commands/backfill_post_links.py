@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.hashtags import sync_post_links
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse #tags and @mentions out of existing posts into PostTag and "
+        "PostMention, walking posts in primary-key order in fixed-size batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.order_by("pk").only("id", "content", "created_at")
+        last_pk = None
+        done = 0
+        while True:
+            # keyset paging keeps each batch query cheap however far we get
+            page = posts if last_pk is None else posts.filter(pk__gt=last_pk)
+            batch = list(page[:batch_size])
+            if not batch:
+                break
+            sync_post_links(batch)
+            last_pk = batch[-1].pk
+            done += len(batch)
+            self.stdout.write(f"indexed {done} posts...")
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed tags and mentions for {done} posts"))
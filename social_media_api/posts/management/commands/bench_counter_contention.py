@@ -0,0 +1,103 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.test.utils import override_settings
+
+from jobs.models import Job
+from posts import counters
+from posts.models import Post, PostCounterShard
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run many writer threads liking one post, first with the counter on "
+        "the post row and then with sharded counters, and report throughput, "
+        "latency and lock retries. The scratch user and post are deleted "
+        "afterwards. Row locks only matter on a server database; SQLite "
+        "serializes all writers either way."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--writes", type=int, default=200, help="Writes per thread")
+        parser.add_argument("--shards", type=int, default=8)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            email=f"bench-{uuid.uuid4().hex}@example.com",
+            username=f"bench-{uuid.uuid4().hex[:12]}",
+            password=None,
+        )
+        post = Post.objects.create(author=user, content="bench_counter_contention")
+        self.stdout.write(
+            f"{connection.vendor}: {options['threads']} threads x {options['writes']} likes on one post"
+        )
+        try:
+            # no automatic promotion, each run picks its mode explicitly
+            with override_settings(POST_COUNTER_HOT_WRITES=None, POST_COUNTER_SHARDS=options["shards"]):
+                self.run("row", post, options)
+                counters.promote(post.pk)
+                self.run(f"{options['shards']} shards", post, options)
+                counters.fold(post.pk)
+            post.refresh_from_db()
+            expected = 2 * options["threads"] * options["writes"]
+            self.stdout.write(f"likes_count after folding: {post.likes_count} (expected {expected})")
+        finally:
+            # the link-indexing and fold jobs queued for the scratch post
+            Job.objects.filter(dedupe_key__endswith=str(post.pk)).delete()
+            PostCounterShard.objects.filter(post=post).delete()
+            post.delete()
+            user.delete()
+
+    def run(self, label, post, options):
+        post = Post.objects.get(pk=post.pk)
+        latencies = []
+        retries = [0]
+        lock = threading.Lock()
+        start = threading.Barrier(options["threads"] + 1)
+
+        def writer():
+            mine = []
+            retried = 0
+            start.wait()
+            try:
+                for _ in range(options["writes"]):
+                    began = time.perf_counter()
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                post.bump_counters(likes_count=1)
+                            break
+                        except OperationalError:  # SQLite: database is locked
+                            retried += 1
+                    mine.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(mine)
+                retries[0] += retried
+
+        threads = [threading.Thread(target=writer) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.stdout.write(
+            f"{label:>10}: {len(latencies) / elapsed:8.0f} writes/s"
+            f"  p50 {statistics.median(latencies) * 1000:6.2f} ms"
+            f"  p99 {p99 * 1000:6.2f} ms"
+            f"  retries {retries[0]}"
+        )
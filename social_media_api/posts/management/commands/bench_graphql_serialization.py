@@ -0,0 +1,105 @@
+import gzip
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from graphql_relay import to_global_id
+
+from social_media_api import views
+
+
+def feed_result(posts, comments_per_post, interactions_per_post, seed):
+    """A posts(first: N) result shaped like the feed query, with nested comments and interactions."""
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    def when():
+        return (now - timedelta(seconds=rng.randrange(10**6))).isoformat()
+
+    def user():
+        return {"id": str(uuid.UUID(int=rng.getrandbits(128))), "username": f"user{rng.randrange(10**5)}"}
+
+    def words(n):
+        return " ".join(rng.choice(("lorem", "ipsum", "dolor", "sit", "amet", "#django", "@bob")) for _ in range(n))
+
+    edges = []
+    for _ in range(posts):
+        edges.append({"node": {
+            "id": to_global_id("PostNode", uuid.UUID(int=rng.getrandbits(128))),
+            "content": words(40),
+            "author": user(),
+            "createdAt": when(),
+            "updatedAt": when(),
+            "likesCount": rng.randrange(10**4),
+            "commentsCount": comments_per_post,
+            "sharesCount": rng.randrange(10**3),
+            "comments": {"edges": [
+                {"node": {
+                    "id": to_global_id("CommentNode", uuid.UUID(int=rng.getrandbits(128))),
+                    "content": words(15),
+                    "author": user(),
+                    "createdAt": when(),
+                }}
+                for _ in range(comments_per_post)
+            ]},
+            "interactions": {"edges": [
+                {"node": {
+                    "id": to_global_id("InteractionNode", rng.randrange(10**9)),
+                    "type": rng.choice(("LIKE", "SHARE")),
+                    "user": user(),
+                    "createdAt": when(),
+                }}
+                for _ in range(interactions_per_post)
+            ]},
+        }})
+    return {"data": {"posts": {"edges": edges, "pageInfo": {"hasNextPage": True, "endCursor": "YXJyYXljb25uZWN0aW9uOjQ5"}}}}
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure serialization time and bytes on the wire for a feed-sized "
+        "GraphQL result: stdlib json vs the configured encoder, uncompressed "
+        "vs gzip vs brotli."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=50)
+        parser.add_argument("--comments", type=int, default=20)
+        parser.add_argument("--interactions", type=int, default=30)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        result = feed_result(options["posts"], options["comments"], options["interactions"], options["seed"])
+        encoder = views.get_json_encoder()
+
+        self.stdout.write(f"encoder: {encoder.__module__}.{encoder.__name__}")
+        baseline, baseline_time = timed(lambda: json.dumps(result, separators=(",", ":")).encode(), repeat)
+        body, encode_time = timed(lambda: encoder(result), repeat)
+        self.stdout.write(f"{'stdlib json':22} {baseline_time * 1000:8.2f} ms  {len(baseline) / 1024:9.1f} KiB")
+        self.stdout.write(f"{'configured encoder':22} {encode_time * 1000:8.2f} ms  {len(body) / 1024:9.1f} KiB")
+
+        codings = [("gzip", lambda: gzip.compress(body, compresslevel=6))]
+        if views.brotli is not None:
+            codings.append(("br", lambda: views.brotli.compress(body, quality=5)))
+        else:
+            self.stdout.write("brotli not installed; skipping br")
+        for coding, fn in codings:
+            compressed, compress_time = timed(fn, repeat)
+            self.stdout.write(
+                f"{coding:22} {compress_time * 1000:8.2f} ms  {len(compressed) / 1024:9.1f} KiB"
+                f"  ({len(compressed) / len(body):.1%} of uncompressed)"
+            )
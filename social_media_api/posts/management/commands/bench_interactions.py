@@ -0,0 +1,163 @@
+import random
+import time
+import uuid
+
+from django.apps.registry import Apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import Count, Q
+
+from posts.models import Interaction, Post
+
+User = get_user_model()
+
+
+def legacy_interaction_model():
+    """
+    The pre-0002 Interaction layout (UUID key, varchar type, unique_together
+    plus separate FK indexes), registered in a throwaway app registry so the
+    benchmark can build it next to the real table.
+    """
+    class LegacyInteraction(models.Model):
+        id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+        post_id = models.UUIDField(db_index=True)
+        user_id = models.UUIDField(db_index=True)
+        type = models.CharField(max_length=10)
+        created_at = models.DateTimeField(auto_now_add=True)
+
+        class Meta:
+            apps = Apps()
+            app_label = "posts"
+            db_table = "bench_legacy_interaction"
+            unique_together = ("post_id", "user_id", "type")
+
+    return LegacyInteraction
+
+
+def table_bytes(table):
+    """Bytes used by a table and all of its indexes, or None if unknown."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = %s OR name IN "
+                "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                [table, table],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare storage and lookup cost of the compact Interaction table "
+        "against the legacy UUID/varchar layout. The sample rows are rolled "
+        "back and the scratch legacy table dropped afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--interactions", type=int, default=50000)
+        parser.add_argument("--lookups", type=int, default=2000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        Legacy = legacy_interaction_model()
+        with connection.schema_editor() as editor:
+            editor.create_model(Legacy)
+        try:
+            with transaction.atomic():
+                self.run(Legacy, rng, options)
+                transaction.set_rollback(True)
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(Legacy)
+
+    def run(self, Legacy, rng, options):
+        run_id = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            User(email=f"bench-{run_id}-{i}@example.com", username=f"bench-{run_id}-{i}")
+            for i in range(options["users"])
+        )
+        author = users[0]
+        posts = Post.objects.bulk_create(
+            Post(author=author, content=f"bench post {i}") for i in range(options["posts"])
+        )
+
+        triples = set()
+        while len(triples) < options["interactions"]:
+            triples.add((
+                rng.randrange(len(posts)),
+                rng.randrange(len(users)),
+                rng.choice((Interaction.LIKE, Interaction.SHARE)),
+            ))
+        triples = sorted(triples)
+        names = {Interaction.LIKE: "like", Interaction.SHARE: "share"}
+
+        Interaction.objects.bulk_create(
+            (Interaction(post=posts[p], user=users[u], type=t) for p, u, t in triples),
+            batch_size=2000,
+        )
+        Legacy.objects.bulk_create(
+            (Legacy(post_id=posts[p].pk, user_id=users[u].pk, type=names[t]) for p, u, t in triples),
+            batch_size=2000,
+        )
+
+        probes = [
+            (posts[rng.randrange(len(posts))], users[rng.randrange(len(users))], rng.choice((1, 2)))
+            for _ in range(options["lookups"])
+        ]
+
+        # compile the SQL up front so the timings measure the database rather
+        # than ORM query construction, which is identical for both layouts
+        def counts(qs, like, share):
+            return qs.order_by().values("post_id").annotate(
+                likes=Count("id", filter=Q(type=like)),
+                shares=Count("id", filter=Q(type=share)),
+            )
+
+        statements = {
+            "legacy   exists()": [
+                Legacy.objects.filter(post_id=post.pk, user_id=user.pk, type=names[t]).values("pk")[:1]
+                for post, user, t in probes
+            ],
+            "compact  exists()": [
+                Interaction.objects.filter(post_id=post.pk, type=t, user_id=user.pk).order_by().values("pk")[:1]
+                for post, user, t in probes
+            ],
+            "legacy   counts": [
+                counts(Legacy.objects.filter(post_id=post.pk), "like", "share")
+                for post, _, _ in probes
+            ],
+            "compact  counts": [
+                counts(Interaction.objects.filter(post_id=post.pk), Interaction.LIKE, Interaction.SHARE)
+                for post, _, _ in probes
+            ],
+        }
+
+        rows = len(triples)
+        self.stdout.write(f"{rows} interactions, {len(posts)} posts, {len(users)} users, {len(probes)} lookups")
+        for label, table in (("legacy", Legacy._meta.db_table), ("compact", Interaction._meta.db_table)):
+            size = table_bytes(table)
+            if size is None:
+                self.stdout.write(f"{label:8} storage: not available on {connection.vendor}")
+            else:
+                self.stdout.write(f"{label:8} storage: {size / 1024:10.1f} KiB  ({size / rows:6.1f} bytes/row incl. indexes)")
+
+        with connection.cursor() as cursor:
+            for label, querysets in statements.items():
+                compiled = [qs.query.sql_with_params() for qs in querysets]
+                for sql, params in compiled:  # warm the page cache
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                start = time.perf_counter()
+                for sql, params in compiled:
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{label:18} {elapsed * 1000:9.1f} ms  ({elapsed / len(compiled) * 1e6:7.1f} us/op)")
@@ -0,0 +1,115 @@
+import json
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve
+from graphql_jwt.shortcuts import get_token
+
+from social_media_api import profiling
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a GraphQL operation stored by request profiling against the "
+        "local database, through the /graphql/ view, under the stack sampler. "
+        "Writes a collapsed-stack file for all runs together. Each run is "
+        "rolled back unless --commit is given; repeated mutations still count "
+        "towards the user's rate limits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("profile", help="A stored .json file, or its name in GRAPHQL_PROFILE_DIR")
+        parser.add_argument("--user", help="Username to run as instead of the stored user")
+        parser.add_argument("--variables", help="JSON object merged over the stored variables")
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--interval-ms", type=float, default=1)
+        parser.add_argument("--output-dir", help="Defaults to GRAPHQL_PROFILE_DIR")
+        parser.add_argument("--commit", action="store_true", help="Keep what the operation writes")
+
+    def handle(self, *args, **options):
+        stored = self.load(options["profile"])
+        variables = stored["variables"]
+        if options["variables"]:
+            variables = {**variables, **json.loads(options["variables"])}
+        if "[redacted]" in json.dumps(variables):
+            self.stderr.write("Some variables were redacted when stored; pass them with --variables")
+        user = self.get_user(options["user"], stored["user"])
+
+        body = json.dumps({
+            "query": stored["query"],
+            "variables": variables,
+            "operationName": stored["operationName"],
+        })
+        headers = {"HTTP_AUTHORIZATION": f"JWT {get_token(user)}"} if user else {}
+        view = resolve("/graphql/").func
+        sampler = profiling.StackSampler(options["interval_ms"] / 1000)
+        timings = []
+
+        # the replay is profiled here, not by the view's own sampling
+        with override_settings(GRAPHQL_PROFILE_SAMPLE_RATE=0):
+            for run in range(options["repeat"]):
+                request = RequestFactory().post("/graphql/", body, content_type="application/json", **headers)
+                with transaction.atomic():
+                    began = time.perf_counter()
+                    with sampler:
+                        response = view(request)
+                    timings.append(time.perf_counter() - began)
+                    if not options["commit"]:
+                        transaction.set_rollback(True)
+                if run == 0:
+                    self.check_response(response)
+
+        name = profiling.save(
+            sampler, stored["operationName"], stored["query"], variables, user, sum(timings),
+            directory=options["output_dir"],
+        )
+        self.stdout.write(
+            f"{stored['operationName'] or 'anonymous'}: {len(timings)} runs"
+            f"  min {min(timings) * 1000:.2f} ms"
+            f"  median {statistics.median(timings) * 1000:.2f} ms"
+            f"  max {max(timings) * 1000:.2f} ms"
+            f"  (stored request: {stored['elapsedMs']} ms)"
+        )
+        directory = options["output_dir"] or settings.GRAPHQL_PROFILE_DIR
+        self.stdout.write(self.style.SUCCESS(
+            f"{sampler.samples} samples written to {os.path.join(directory, name)}.collapsed"
+        ))
+
+    def load(self, profile):
+        path = profile
+        if not os.path.exists(path):
+            path = os.path.join(settings.GRAPHQL_PROFILE_DIR, profile.removesuffix(".json") + ".json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No stored operation at {profile} or {path}")
+
+    def get_user(self, username, stored_user_id):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user {username}")
+        if stored_user_id is None:
+            return None
+        user = User.objects.filter(pk=stored_user_id).first()
+        if user is None:
+            self.stderr.write("The stored user doesn't exist here, running anonymously; pass --user")
+        return user
+
+    def check_response(self, response):
+        if response.status_code != 200:
+            raise CommandError(f"/graphql/ answered {response.status_code}: {response.content[:500]!r}")
+        errors = json.loads(response.content).get("errors")
+        if errors:
+            self.stderr.write(f"The operation returned errors: {json.dumps(errors)[:500]}")
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.purge import purge_post_rows, purge_user_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge soft-deleted users and posts with everything that depends on "
+        "them, in bounded batches. Soft deletion already queues purge jobs; "
+        "this catches up without run_workers, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        users = 0
+        for user_id in list(User.objects.filter(deleted_at__isnull=False).values_list("pk", flat=True)):
+            purge_user_rows(user_id, batch_size)
+            users += 1
+            self.stdout.write(f"purged {users} users...")
+
+        posts = 0
+        for post_id in list(Post.objects.filter(deleted_at__isnull=False).values_list("pk", flat=True)):
+            purge_post_rows(post_id, batch_size)
+            posts += 1
+            if posts % 100 == 0:
+                self.stdout.write(f"purged {posts} posts...")
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {users} users and {posts} posts"))
@@ -0,0 +1,160 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from posts.models import ArchivedInteraction, Comment, Interaction, Post, PostCounterShard
+
+User = get_user_model()
+
+INTERACTION_COUNTERS = {Interaction.LIKE: "likes_count", Interaction.SHARE: "shares_count"}
+POST_COUNTERS = ("likes_count", "shares_count", "comments_count")
+USER_COUNTERS = ("posts_count", "comments_count", "likes_received_count")
+
+
+def batches(queryset, batch_size):
+    """Yield lists of primary keys of queryset, walking the pk index."""
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    last_pk = None
+    while True:
+        page = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def stored_post_counters(post_ids):
+    # hot posts keep part of their counts in PostCounterShard rows
+    rows = Post.objects.filter(pk__in=post_ids).values("pk").annotate(**{
+        f"total_{field}": F(field) + Coalesce(Sum(f"counter_shards__{field}"), 0)
+        for field in POST_COUNTERS
+    })
+    return {row["pk"]: tuple(row[f"total_{field}"] for field in POST_COUNTERS) for row in rows}
+
+
+def stored_user_counters(user_ids):
+    rows = User.objects.filter(pk__in=user_ids).values_list("pk", *USER_COUNTERS)
+    return {row[0]: row[1:] for row in rows}
+
+
+def actual_post_counters(post_ids):
+    actual = {pk: Counter() for pk in post_ids}
+    # archived interactions still count towards likes and shares
+    for model in (Interaction, ArchivedInteraction):
+        rows = (
+            model.objects.filter(post_id__in=post_ids).order_by()
+            .values_list("post_id", "type").annotate(n=Count("pk"))
+        )
+        for post_id, type, n in rows:
+            actual[post_id][INTERACTION_COUNTERS[type]] += n
+    rows = (
+        Comment.objects.filter(post_id__in=post_ids).order_by()
+        .values_list("post_id").annotate(n=Count("pk"))
+    )
+    for post_id, n in rows:
+        actual[post_id]["comments_count"] += n
+    return actual
+
+
+def lock_post(pk):
+    # row writers and shard writers both wait for the fix to commit
+    list(Post.objects.select_for_update().filter(pk=pk).values_list("pk"))
+    list(PostCounterShard.objects.select_for_update().filter(post_id=pk).values_list("pk"))
+
+
+def lock_user(pk):
+    list(User.objects.select_for_update().filter(pk=pk).values_list("pk"))
+
+
+def drift(pks, fields, stored_counters, actual_counters):
+    """Yield (pk, {field: actual - stored}) for the rows whose counters are off."""
+    stored = stored_counters(pks)
+    actual = actual_counters(pks)
+    for pk, values in stored.items():
+        deltas = {
+            field: actual[pk][field] - value
+            for field, value in zip(fields, values)
+            if actual[pk][field] != value
+        }
+        if deltas:
+            yield pk, deltas
+
+
+def actual_user_counters(user_ids):
+    actual = {pk: Counter() for pk in user_ids}
+    # likes in unfolded counter shards haven't reached the author yet, so
+    # only the post rows' likes_count is summed
+    live_posts = Post.objects.filter(author_id__in=user_ids, deleted_at__isnull=True).order_by()
+    rows = live_posts.values_list("author_id").annotate(n=Count("pk"), likes=Sum("likes_count"))
+    for author_id, n, likes in rows:
+        actual[author_id]["posts_count"] = n
+        actual[author_id]["likes_received_count"] = likes or 0
+    rows = (
+        Comment.objects.filter(author_id__in=user_ids).order_by()
+        .values_list("author_id").annotate(n=Count("pk"))
+    )
+    for author_id, n in rows:
+        actual[author_id]["comments_count"] = n
+    return actual
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the denormalized counters on posts (likes, shares, comments) "
+        "and users (posts, comments, likes received) with the rows they "
+        "count, in primary-key batches, and with --fix correct the drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--fix", action="store_true",
+                            help="Write corrections instead of only reporting")
+        parser.add_argument("--only", choices=["posts", "users"])
+
+    def handle(self, *args, **options):
+        self.fix = options["fix"]
+        self.verbosity = options["verbosity"]
+        batch_size = options["batch_size"]
+        # users' likes_received_count is summed from post counters, so
+        # posts go first
+        if options["only"] in (None, "posts"):
+            self.reconcile(
+                "posts", Post.objects.filter(deleted_at__isnull=True), POST_COUNTERS,
+                stored_post_counters, actual_post_counters, batch_size, lock_post,
+                # bump_counters also stamps updated_at for delta sync
+                lambda pk, deltas: Post(pk=pk).bump_counters(**deltas),
+            )
+        if options["only"] in (None, "users"):
+            self.reconcile(
+                "users", User.objects.filter(deleted_at__isnull=True), USER_COUNTERS,
+                stored_user_counters, actual_user_counters, batch_size, lock_user,
+                lambda pk, deltas: User(pk=pk).bump_counters(**deltas),
+            )
+
+    def reconcile(self, label, queryset, fields, stored_counters, actual_counters, batch_size, lock, apply):
+        checked = drifted = 0
+        for pks in batches(queryset, batch_size):
+            for pk, deltas in drift(pks, fields, stored_counters, actual_counters):
+                drifted += 1
+                if self.verbosity > 1:
+                    self.stdout.write(f"{label} {pk}: {deltas}")
+                if self.fix:
+                    self.fix_row(pk, fields, stored_counters, actual_counters, lock, apply)
+            checked += len(pks)
+            self.stdout.write(f"checked {checked} {label}...")
+
+        action = "fixed" if self.fix else "found"
+        self.stdout.write(self.style.SUCCESS(f"{label}: {action} drift in {drifted} of {checked}"))
+
+    def fix_row(self, pk, fields, stored_counters, actual_counters, lock, apply):
+        # counted again under the row lock: a write that committed before it
+        # is in the count, and one that commits after adds to the fixed value
+        with transaction.atomic():
+            lock(pk)
+            for _, deltas in drift([pk], fields, stored_counters, actual_counters):
+                apply(pk, deltas)
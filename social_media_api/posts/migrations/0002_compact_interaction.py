@@ -0,0 +1,110 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+TYPE_TO_INT = {"like": 1, "share": 2}
+TYPE_TO_NAME = {value: name for name, value in TYPE_TO_INT.items()}
+BATCH_SIZE = 2000
+
+
+def copy_to_compact(apps, schema_editor):
+    # one INSERT ... SELECT: the rows never pass through Python, and
+    # created_at is copied as is (bulk_create would apply auto_now_add)
+    Interaction = apps.get_model("posts", "Interaction")
+    CompactInteraction = apps.get_model("posts", "CompactInteraction")
+    # a type we can't map is bad data to fix first, not a share
+    unknown = dict(
+        Interaction.objects.exclude(type__in=TYPE_TO_INT)
+        .values_list("type").annotate(n=models.Count("id")).order_by()
+    )
+    if unknown:
+        raise Exception(
+            f"Cannot migrate interactions with unknown types (type: count): {unknown}; "
+            f"change them to one of {sorted(TYPE_TO_INT)} or delete them first"
+        )
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f"INSERT INTO {quote(CompactInteraction._meta.db_table)} (post_id, user_id, type, created_at) "
+        f"SELECT post_id, user_id, CASE type WHEN %s THEN %s WHEN %s THEN %s END, created_at "
+        f"FROM {quote(Interaction._meta.db_table)} ORDER BY created_at",
+        ["like", TYPE_TO_INT["like"], "share", TYPE_TO_INT["share"]],
+    )
+
+
+def copy_to_legacy(apps, schema_editor):
+    import uuid
+
+    Interaction = apps.get_model("posts", "Interaction")
+    CompactInteraction = apps.get_model("posts", "CompactInteraction")
+    # the legacy UUID keys are made in Python, so this side goes through
+    # bulk_create; keep it from stamping created_at with the current time
+    Interaction._meta.get_field("created_at").auto_now_add = False
+    batch = []
+    rows = CompactInteraction.objects.order_by("id").values_list(
+        "post_id", "user_id", "type", "created_at"
+    )
+    for post_id, user_id, type, created_at in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Interaction(
+            id=uuid.uuid4(),
+            post_id=post_id,
+            user_id=user_id,
+            type=TYPE_TO_NAME[type],
+            created_at=created_at,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            Interaction.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Interaction.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    """
+    Rebuild posts_interaction with a BigAutoField key, a SmallIntegerField
+    type and a single (post, type, user) unique index. The rows are copied
+    into a new table because a UUID primary key cannot be altered into an
+    integer one in place on every backend.
+    """
+
+    dependencies = [
+        ("posts", "0001_initial"),
+        ("users", "0002_alter_user_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactInteraction",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("type", models.SmallIntegerField(choices=[(1, "Like"), (2, "Share")])),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("post", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to="posts.post")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.RunPython(copy_to_compact, copy_to_legacy),
+        migrations.DeleteModel(
+            name="Interaction",
+        ),
+        migrations.RenameModel(
+            old_name="CompactInteraction",
+            new_name="Interaction",
+        ),
+        migrations.AlterField(
+            model_name="interaction",
+            name="post",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="interactions", to="posts.post"),
+        ),
+        migrations.AlterField(
+            model_name="interaction",
+            name="user",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="interactions", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name="interaction",
+            constraint=models.UniqueConstraint(fields=("post", "type", "user"), name="posts_interaction_post_type_user_uniq"),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_compact_interaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInteraction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type', models.SmallIntegerField(choices=[(1, 'Like'), (2, 'Share')])),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPostEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type', models.SmallIntegerField(choices=[(1, 'Like'), (2, 'Share')])),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(fields=['created_at'], name='posts_inter_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedinteraction',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.post'),
+        ),
+        migrations.AddField(
+            model_name='archivedinteraction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dailypostengagement',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_engagement', to='posts.post'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedinteraction',
+            index=models.Index(fields=['created_at'], name='posts_archint_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedinteraction',
+            constraint=models.UniqueConstraint(fields=('post', 'type', 'user'), name='posts_archivedinteraction_post_type_user_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='dailypostengagement',
+            index=models.Index(fields=['day'], name='posts_dailyeng_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailypostengagement',
+            constraint=models.UniqueConstraint(fields=('post', 'day', 'type'), name='posts_dailypostengagement_post_day_type_uniq'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:13
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_counters(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+
+    def per_author(queryset, aggregate):
+        return Coalesce(
+            Subquery(
+                queryset.filter(author=OuterRef("pk")).order_by()
+                .values("author").annotate(total=aggregate).values("total"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    live_posts = Post.objects.filter(deleted_at__isnull=True)
+    User.objects.update(
+        posts_count=per_author(live_posts, Count("pk")),
+        comments_count=per_author(Comment.objects.all(), Count("pk")),
+        likes_received_count=per_author(live_posts, Sum("likes_count")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_admin_list_indexes'),
+        ('users', '0006_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_backfill_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='sharded_counters',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PostCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.SmallIntegerField()),
+                ('likes_count', models.IntegerField(default=0)),
+                ('shares_count', models.IntegerField(default=0)),
+                ('comments_count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='posts.post')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('post', 'shard'), name='posts_postcountershard_post_shard_uniq')],
+            },
+        ),
+    ]
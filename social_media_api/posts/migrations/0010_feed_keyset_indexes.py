@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_counter_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='postmention',
+            name='posts_postmention_user_crt_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='posttag',
+            name='posts_posttag_tag_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='postmention',
+            index=models.Index(fields=['user', '-created_at', '-post'], name='posts_mention_user_crt_pid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-created_at', '-post'], name='posts_posttag_tag_crt_pid_idx'),
+        ),
+    ]
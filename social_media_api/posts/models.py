@@ -1,6 +1,34 @@
 import uuid
 from django.db import models
+from django.db.models import F, Q
 from django.conf import settings
+from django.utils import timezone
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        # soft-deleted posts, and posts of soft-deleted users, wait for
+        # `manage.py purge_deleted` (or a purge job) to remove them
+        return self.filter(deleted_at__isnull=True, author__deleted_at__isnull=True)
+
+
+class CommentQuerySet(models.QuerySet):
+    def visible(self):
+        return self.filter(
+            author__deleted_at__isnull=True,
+            post__deleted_at__isnull=True,
+            post__author__deleted_at__isnull=True,
+        )
+
+
+class InteractionQuerySet(models.QuerySet):
+    def visible(self):
+        return self.filter(
+            user__deleted_at__isnull=True,
+            post__deleted_at__isnull=True,
+            post__author__deleted_at__isnull=True,
+        )
+
 
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -11,22 +39,65 @@ class Post(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # bumped by every change, counters included; drives changesSince
     updated_at = models.DateTimeField(auto_now=True)
+    content_updated_at = models.DateTimeField(default=timezone.now)
 
     # denormalized counters (synchronously updated in mutations/signals)
     likes_count = models.IntegerField(default=0)
     comments_count = models.IntegerField(default=0)
     shares_count = models.IntegerField(default=0)
+    # hot posts spread counter writes over PostCounterShard rows; the counts
+    # shown are then these columns plus the shards (see posts/counters.py)
+    sharded_counters = models.BooleanField(default=False)
+
+    # set by soft deletion; the row and its dependents are purged later
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["-created_at"]),
             models.Index(fields=["author"]),
+            models.Index(fields=["updated_at", "id"], name="posts_post_updated_id_idx"),
+            # small: only covers posts waiting to be purged
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="posts_post_deleted_idx",
+            ),
         ]
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:30]}"
+
+    def bump_counters(self, **deltas):
+        """
+        Atomically add deltas to the denormalized counters, e.g.
+        post.bump_counters(likes_count=1), bumping updated_at so delta sync
+        picks the change up. The in-memory values are adjusted to match.
+
+        Posts in sharded mode add to a random PostCounterShard instead and
+        leave the in-memory values alone; returns True when that happened.
+        Posts written often enough are switched to sharded mode.
+        """
+        from . import counters
+
+        if self.sharded_counters and counters.bump_shard(self, deltas):
+            return True
+        if any(delta > 0 for delta in deltas.values()):
+            counters.note_write(self)
+        now = timezone.now()
+        Post.objects.filter(pk=self.pk).update(
+            updated_at=now,
+            **{field: F(field) + delta for field, delta in deltas.items()},
+        )
+        for field, delta in deltas.items():
+            setattr(self, field, getattr(self, field) + delta)
+        self.updated_at = now
+        return False
 class Comment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(
@@ -42,39 +113,211 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # newest-first admin list
+            models.Index(fields=["-created_at"], name="posts_comment_created_idx"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on Post {self.post.id}"
 
 
 class Interaction(models.Model):
-    LIKE = "like"
-    SHARE = "share"
+    # stored as small integers; the GraphQL API still speaks "like"/"share"
+    LIKE = 1
+    SHARE = 2
 
     INTERACTION_CHOICES = [
         (LIKE, "Like"),
         (SHARE, "Share"),
     ]
+    TYPE_BY_NAME = {"like": LIKE, "share": SHARE}
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # integer surrogate key instead of a UUID: 8 bytes (a rowid alias on SQLite)
+    # rather than a 32 char string, in the table and in every secondary index
+    id = models.BigAutoField(primary_key=True)
     post = models.ForeignKey(
         "Post",
         on_delete=models.CASCADE,
-        related_name="interactions"
+        related_name="interactions",
+        db_index=False,  # covered by the leading column of the unique index below
     )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="interactions"
     )
-    type = models.CharField(max_length=10, choices=INTERACTION_CHOICES)
+    type = models.SmallIntegerField(choices=INTERACTION_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = InteractionQuerySet.as_manager()
+
     class Meta:
-        unique_together = ("post", "user", "type")  # prevents duplicate likes/shares
         ordering = ["-created_at"]
+        constraints = [
+            # prevents duplicate likes/shares; (post, type) as the prefix also
+            # serves the per-post like/share counts from the index alone
+            models.UniqueConstraint(
+                fields=["post", "type", "user"],
+                name="posts_interaction_post_type_user_uniq",
+            ),
+        ]
+        indexes = [
+            # range scans for the rollup backfill and the retention archiver
+            models.Index(fields=["created_at"], name="posts_inter_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.get_type_display().lower()}d Post {self.post.id}"
+
+
+class ArchivedInteraction(models.Model):
+    """
+    Raw interactions moved out of posts_interaction by the retention archiver.
+    Same compact layout; kept so old likes/shares still dedupe and so the
+    rollup can be rebuilt.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    type = models.SmallIntegerField(choices=Interaction.INTERACTION_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "type", "user"],
+                name="posts_archivedinteraction_post_type_user_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="posts_archint_created_idx"),
+        ]
+
+
+class DailyPostEngagement(models.Model):
+    """
+    Rollup of interactions per (day, post, type), maintained incrementally by
+    InteractWithPost and rebuilt by the backfill_engagement_rollup command.
+    Analytics read this instead of scanning posts_interaction.
+    """
+    day = models.DateField()
+    post = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        related_name="daily_engagement",
+        db_index=False,  # covered by the unique index below
+    )
+    type = models.SmallIntegerField(choices=Interaction.INTERACTION_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "day", "type"],
+                name="posts_dailypostengagement_post_day_type_uniq",
+            ),
+        ]
+        indexes = [
+            # site-wide "per day" reports
+            models.Index(fields=["day"], name="posts_dailyeng_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.get_type_display()} x{self.count} on Post {self.post_id}"
+
+
+class PostTag(models.Model):
+    """
+    Inverted index from a #tag to the posts that use it. created_at is copied
+    from the post so a tag feed is served by the (tag, created_at, post)
+    index alone.
+    """
+    post = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        related_name="tags",
+        db_index=False,  # covered by the unique index below
+    )
+    tag = models.CharField(max_length=64)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "tag"], name="posts_posttag_post_tag_uniq"),
+        ]
+        indexes = [
+            # the feed's keyset is (created_at, post)
+            models.Index(fields=["tag", "-created_at", "-post"], name="posts_posttag_tag_crt_pid_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.tag} on Post {self.post_id}"
+
+
+class PostMention(models.Model):
+    """Inverted index from a mentioned @user to the posts mentioning them."""
+    post = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        related_name="mentions",
+        db_index=False,  # covered by the unique index below
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="mentioned_in",
+        db_index=False,  # covered by the (user, created_at, post) index
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "user"], name="posts_postmention_post_user_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-post"], name="posts_mention_user_crt_pid_idx"),
+        ]
+
+    def __str__(self):
+        return f"@{self.user_id} on Post {self.post_id}"
+
+
+class PostCounterShard(models.Model):
+    """
+    One of POST_COUNTER_SHARDS rows holding part of a hot post's counters.
+    Writers pick a shard at random, so concurrent likes don't queue on one
+    row lock; a job folds the shards back into the post periodically.
+    """
+    post = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        related_name="counter_shards",
+        db_index=False,  # covered by the unique index below
+    )
+    shard = models.SmallIntegerField()
+    likes_count = models.IntegerField(default=0)
+    shares_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "shard"], name="posts_postcountershard_post_shard_uniq"),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} {self.type}d Post {self.post.id}"
\ No newline at end of file
+        return f"Shard {self.shard} of Post {self.post_id}"
@@ -0,0 +1,126 @@
+"""
+In-process pub/sub used by GraphQL subscriptions.
+
+Mutations publish from request threads; subscribers are WebSocket
+connections living on the ASGI event loop, so delivery always hops onto the
+subscriber's loop with call_soon_threadsafe. Every server process has its own
+broker; a shared broker (Redis, Postgres LISTEN/NOTIFY) can replace it behind
+the same publish/subscribe interface when running several processes.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+
+def post_topic(post_id):
+    return f"post:{post_id}"
+
+
+def comments_topic(post_id):
+    return f"post:{post_id}:comments"
+
+
+class Subscription:
+    """One subscriber's bounded mailbox; async-iterate it to receive payloads."""
+
+    def __init__(self, broker, topic, loop, maxsize):
+        self.broker = broker
+        self.topic = topic
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, payload):
+        # runs on self.loop; a slow client loses its oldest updates rather
+        # than growing the queue without bound
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class Broker:
+    def __init__(self, coalesce_seconds=0.5, queue_size=100):
+        self.coalesce_seconds = coalesce_seconds
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._pending = {}
+
+    def subscribe(self, topic):
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(self, topic, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def has_subscribers(self, topic):
+        return topic in self._subscribers
+
+    def publish(self, topic, payload, coalesce=False):
+        """
+        Fan payload out to every subscriber of topic. With coalesce=True,
+        payloads published within coalesce_seconds of the first one are
+        collapsed and only the latest is delivered, which is what counter
+        updates on a busy post need.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+            if not subscribers:
+                return
+            if coalesce and self.coalesce_seconds > 0:
+                already_scheduled = topic in self._pending
+                self._pending[topic] = payload
+                if already_scheduled:
+                    return
+                loop = subscribers[0].loop
+                try:
+                    loop.call_soon_threadsafe(loop.call_later, self.coalesce_seconds, self._flush, topic)
+                    return
+                except RuntimeError:
+                    # that subscriber's loop has shut down; left pending, the
+                    # topic would never be flushed again
+                    del self._pending[topic]
+        if coalesce and self.coalesce_seconds > 0:
+            self.unsubscribe(subscribers[0])
+            # schedule the flush on another subscriber's loop
+            return self.publish(topic, payload, coalesce=True)
+        self._fan_out(subscribers, payload)
+
+    def _flush(self, topic):
+        with self._lock:
+            payload = self._pending.pop(topic, None)
+            subscribers = list(self._subscribers.get(topic, ()))
+        if payload is not None:
+            self._fan_out(subscribers, payload)
+
+    def _fan_out(self, subscribers, payload):
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, payload)
+            except RuntimeError:
+                # the subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+
+broker = Broker(
+    coalesce_seconds=getattr(settings, "GRAPHQL_SUBSCRIPTION_COALESCE_SECONDS", 0.5),
+    queue_size=getattr(settings, "GRAPHQL_SUBSCRIPTION_QUEUE_SIZE", 100),
+)
@@ -0,0 +1,205 @@
+"""
+Soft deletion and batched purging of posts and users.
+
+Deleting a prolific user or a viral post with Model.delete() makes Django's
+collector load every dependent row and delete them all in one transaction.
+Instead we set deleted_at, which hides the content at once (see the
+visible() querysets), and purge the rows later, a bounded batch of keys
+per transaction, fixing up the counters of the posts that lose comments
+or interactions along the way.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.api import enqueue
+from .models import (
+    ArchivedInteraction,
+    Comment,
+    DailyPostEngagement,
+    Interaction,
+    Post,
+    PostCounterShard,
+    PostMention,
+    PostTag,
+)
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def soft_delete_posts(posts):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            posts.filter(deleted_at__isnull=True).select_for_update()
+            .values_list("pk", "author_id", "likes_count")
+        )
+        # bumping updated_at lets changesSince tell clients the posts are gone
+        Post.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(deleted_at=now, updated_at=now)
+        # deleted posts no longer count towards their authors' stats
+        per_author = {}
+        for _, author_id, likes in rows:
+            stats = per_author.setdefault(author_id, {"posts_count": 0, "likes_received_count": 0})
+            stats["posts_count"] -= 1
+            stats["likes_received_count"] -= likes
+        for author_id, deltas in per_author.items():
+            User(pk=author_id).bump_counters(**deltas)
+        for pk, _, _ in rows:
+            enqueue("posts.purge_post", {"post_id": str(pk)}, dedupe_key=f"posts.purge_post:{pk}")
+    return len(rows)
+
+
+def soft_delete_users(users):
+    ids = list(users.filter(deleted_at__isnull=True).values_list("pk", flat=True))
+    User.objects.filter(pk__in=ids).update(deleted_at=timezone.now(), is_active=False)
+    for pk in ids:
+        enqueue("posts.purge_user", {"user_id": str(pk)}, dedupe_key=f"posts.purge_user:{pk}")
+    return len(ids)
+
+
+def delete_batch(queryset, batch_size, fields=("pk",)):
+    """
+    Delete the first batch_size rows of queryset in primary-key order and
+    return their fields. The pk list keeps each DELETE a bounded key lookup.
+    """
+    rows = list(queryset.order_by("pk").values_list(*fields)[:batch_size])
+    if rows:
+        queryset.model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return rows
+
+
+def subtract_counters(deltas):
+    """
+    Apply {(post_id, counter): n} decrements, one UPDATE per post, and take
+    lost likes off the likes_received_count of the posts' authors.
+    """
+    per_post = {}
+    for (post_id, field), n in deltas.items():
+        per_post.setdefault(post_id, {})[field] = -n
+    for post_id, fields in per_post.items():
+        # only the pk is needed to run the counter UPDATE
+        Post(pk=post_id).bump_counters(**fields)
+
+    liked = [post_id for post_id, fields in per_post.items() if "likes_count" in fields]
+    per_author = Counter()
+    # deleted posts were already taken off their authors' stats
+    for post_id, author_id in Post.objects.filter(
+        pk__in=liked, deleted_at__isnull=True
+    ).values_list("pk", "author_id"):
+        per_author[author_id] += per_post[post_id]["likes_count"]
+    for author_id, n in per_author.items():
+        User(pk=author_id).bump_counters(likes_received_count=n)
+
+
+def interaction_counter(type):
+    return "likes_count" if type == Interaction.LIKE else "shares_count"
+
+
+def purge_post_rows(post_id, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Delete the dependents of a post and then the post itself. Returns True
+    when it's gone, False if max_batches ran out first. Only batches that
+    deleted something count, so every call makes progress.
+    """
+    dependents = [
+        Interaction.objects.filter(post_id=post_id),
+        ArchivedInteraction.objects.filter(post_id=post_id),
+        DailyPostEngagement.objects.filter(post_id=post_id),
+        PostTag.objects.filter(post_id=post_id),
+        PostMention.objects.filter(post_id=post_id),
+        PostCounterShard.objects.filter(post_id=post_id),
+    ]
+    batches = 0
+    comments = Comment.objects.filter(post_id=post_id)
+    while True:
+        if max_batches is not None and batches >= max_batches:
+            return False
+        with transaction.atomic():
+            rows = delete_batch(comments, batch_size, ("pk", "author_id"))
+            for author_id, n in Counter(author_id for _, author_id in rows).items():
+                User(pk=author_id).bump_counters(comments_count=-n)
+        batches += bool(rows)
+        if len(rows) < batch_size:
+            break
+    for queryset in dependents:
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                return False
+            with transaction.atomic():
+                rows = delete_batch(queryset, batch_size)
+            batches += bool(rows)
+            if len(rows) < batch_size:
+                break
+    # nothing references it any more, so the collector has nothing to load
+    Post.objects.filter(pk=post_id).delete()
+    return True
+
+
+def purge_user_rows(user_id, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Delete everything a user wrote, their posts and then the user. Their
+    posts are first stamped as changed for delta sync, and counters of
+    other users' posts are decremented batch by batch. Returns True when
+    done, False if max_batches ran out first.
+    """
+    batches = 0
+
+    def spent():
+        return max_batches is not None and batches >= max_batches
+
+    # bump their posts' updated_at first, so changesSince reports them as
+    # deleted before they're purged; posts stamped after the user was
+    # deleted are done, which makes this resumable
+    deleted_at = User.objects.filter(pk=user_id).values_list("deleted_at", flat=True).first()
+    if deleted_at is not None:
+        unstamped = Post.objects.filter(author_id=user_id, updated_at__lte=deleted_at)
+        while True:
+            if spent():
+                return False
+            pks = list(unstamped.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            Post.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+            batches += bool(pks)
+            if len(pks) < batch_size:
+                break
+
+    # their likes, shares and comments on other posts
+    for queryset, fields in (
+        (Interaction.objects.filter(user_id=user_id), ("pk", "post_id", "type")),
+        (ArchivedInteraction.objects.filter(user_id=user_id), ("pk", "post_id", "type")),
+        (Comment.objects.filter(author_id=user_id), ("pk", "post_id")),
+        (PostMention.objects.filter(user_id=user_id), ("pk",)),
+    ):
+        while True:
+            if spent():
+                return False
+            with transaction.atomic():
+                rows = delete_batch(queryset, batch_size, fields)
+                deltas = Counter()
+                if queryset.model is Comment:
+                    deltas.update((post_id, "comments_count") for _, post_id in rows)
+                elif queryset.model is not PostMention:
+                    deltas.update((post_id, interaction_counter(type)) for _, post_id, type in rows)
+                subtract_counters(deltas)
+            batches += bool(rows)
+            if len(rows) < batch_size:
+                break
+
+    # their own posts, one at a time
+    posts = Post.objects.filter(author_id=user_id).order_by("pk").values_list("pk", flat=True)
+    while True:
+        post_id = posts.first()
+        if post_id is None:
+            break
+        if spent():
+            return False
+        remaining = None if max_batches is None else max_batches - batches
+        if not purge_post_rows(post_id, batch_size, remaining):
+            return False
+        batches += 1
+
+    User.objects.filter(pk=user_id).delete()
+    return True
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyPostEngagement
+
+
+def record_interaction(interaction):
+    """Add one new interaction to its (day, post, type) rollup row."""
+    day = timezone.localdate(interaction.created_at)
+    rows = DailyPostEngagement.objects.filter(
+        post_id=interaction.post_id, day=day, type=interaction.type
+    )
+    if rows.update(count=F("count") + 1):
+        return
+    try:
+        with transaction.atomic():
+            DailyPostEngagement.objects.create(
+                post_id=interaction.post_id, day=day, type=interaction.type, count=1
+            )
+    except IntegrityError:
+        # another request created the row between our update and insert
+        rows.update(count=F("count") + 1)
+
+
+def retention_cutoff():
+    """
+    Interactions created before this moment may have been moved to
+    ArchivedInteraction, or None when retention is disabled.
+    """
+    days = getattr(settings, "INTERACTION_RETENTION_DAYS", None)
+    if not days:
+        return None
+    return timezone.now() - timedelta(days=days)
@@ -1,20 +1,50 @@
+import uuid
 import graphene
 from graphene import relay
 from graphene_django import DjangoObjectType
 from graphql_relay.node.node import from_global_id, to_global_id
 from graphene_django.filter import DjangoFilterConnectionField
 from django.contrib.auth import get_user_model
-from .models import Post, Interaction, Comment
-from django.db.models import Count, Q
+from .models import (
+    Post, Interaction, Comment, ArchivedInteraction, DailyPostEngagement, PostMention, PostTag,
+)
+from .rollups import retention_cutoff
+from .purge import soft_delete_posts
+from .counters import counter_value, sharded_totals
+from .hashtags import normalize_tag
+from .pubsub import broker, post_topic, comments_topic
+from social_media_api.idempotency import idempotent
+from jobs.api import enqueue
+from users.images import profile_image_url
+from users.schema import ProfileImageSize
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Case, F, Q, When
 from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+import base64
 
 User = get_user_model()
 
 
 class UserSummaryType(DjangoObjectType):
+    profile_image = graphene.String(size=ProfileImageSize())
+
     class Meta:
         model = User
-        fields = ("id", "username", "profile_image")
+        fields = (
+            "id",
+            "username",
+            "profile_image",
+            "posts_count",
+            "comments_count",
+            "likes_received_count",
+        )
+
+    def resolve_profile_image(self, info, size=None):
+        return profile_image_url(self, size.value if size else None)
 
 
 class PostNode(DjangoObjectType):
@@ -38,6 +68,20 @@ class PostNode(DjangoObjectType):
             "shares_count",
         )
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return queryset.visible()
+
+    # hot posts keep part of their counts in shards (posts/counters.py)
+    def resolve_likes_count(self, info):
+        return counter_value(self, "likes_count")
+
+    def resolve_comments_count(self, info):
+        return counter_value(self, "comments_count")
+
+    def resolve_shares_count(self, info):
+        return counter_value(self, "shares_count")
+
 class CommentNode(DjangoObjectType):
     class Meta:
         model = Comment
@@ -48,8 +92,23 @@ class CommentNode(DjangoObjectType):
         }
         fields = ("id", "content", "author", "post", "created_at")
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return queryset.visible()
+
+
+class InteractionTypeEnum(graphene.Enum):
+    # keeps the LIKE/SHARE names the API exposed before type became an integer
+    LIKE = Interaction.LIKE
+    SHARE = Interaction.SHARE
+
+    class Meta:
+        name = "PostsInteractionTypeChoices"
+
 
 class InteractionNode(DjangoObjectType):
+    type = InteractionTypeEnum()
+
     class Meta:
         model = Interaction
         interfaces = (relay.Node,)
@@ -60,27 +119,213 @@ class InteractionNode(DjangoObjectType):
         }
         fields = ("id", "type", "user", "post", "created_at")
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return queryset.visible()
+
+class PostEngagementDay(graphene.ObjectType):
+    day = graphene.Date()
+    likes = graphene.Int()
+    shares = graphene.Int()
+
+
+class PostCountersType(graphene.ObjectType):
+    id = graphene.ID()
+    likes_count = graphene.Int()
+    comments_count = graphene.Int()
+    shares_count = graphene.Int()
+
+
+class CommentAddedType(graphene.ObjectType):
+    id = graphene.ID()
+    post_id = graphene.ID()
+    content = graphene.String()
+    author_username = graphene.String()
+    created_at = graphene.DateTime()
+
+
+def publish_post_counters(post_pk):
+    """Push a post's current counters to postUpdated subscribers, if any."""
+    topic = post_topic(post_pk)
+    if not broker.has_subscribers(topic):
+        return
+    counters = Post.objects.filter(pk=post_pk).values(
+        "likes_count", "comments_count", "shares_count", "sharded_counters"
+    ).first()
+    if counters is not None:
+        if counters.pop("sharded_counters"):
+            counters = sharded_totals(post_pk, cached=False)
+        broker.publish(
+            topic,
+            PostCountersType(id=to_global_id("PostNode", post_pk), **counters),
+            coalesce=True,
+        )
+
+
+def publish_comment_added(comment, username):
+    broker.publish(comments_topic(comment.post_id), CommentAddedType(
+        id=to_global_id("CommentNode", comment.pk),
+        post_id=to_global_id("PostNode", comment.post_id),
+        content=comment.content,
+        author_username=username,
+        created_at=comment.created_at,
+    ))
+
+
+class PostChangeType(graphene.ObjectType):
+    id = graphene.ID()
+    likes_count = graphene.Int()
+    comments_count = graphene.Int()
+    shares_count = graphene.Int()
+    # only set when the content itself changed after the watermark
+    content = graphene.String()
+    # the post was deleted; drop it instead of applying the other fields
+    deleted = graphene.Boolean()
+    updated_at = graphene.DateTime()
+
+
+class PostChangesType(graphene.ObjectType):
+    changes = graphene.List(PostChangeType)
+    watermark = graphene.String()
+    has_more = graphene.Boolean()
+
+
+CHANGES_SINCE_MAX_IDS = 500
+
+
+def encode_watermark(updated_at, pk):
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_watermark(watermark, what="watermark"):
+    try:
+        updated_at, pk = base64.urlsafe_b64decode(watermark.encode()).decode().split("|")
+        updated_at = parse_datetime(updated_at)
+        pk = uuid.UUID(pk)
+    except Exception:
+        raise Exception(f"Invalid {what}")
+    if updated_at is None:
+        raise Exception(f"Invalid {what}")
+    return updated_at, pk
+
+
+def link_feed(links, first=None, after=None, before=None, last=None):
+    """
+    A page of posts from PostTag/PostMention rows, newest first. The cursor
+    is the link's (created_at, post_id), so every page is a seek on the
+    (tag|user, created_at, post) index; there is no COUNT and no OFFSET.
+    """
+    if before is not None or last is not None:
+        raise Exception("Only forward paging (first/after) is supported")
+    first = max(1, min(first or 20, 100))
+    if after:
+        created_at, post_id = decode_watermark(after, "cursor")
+        links = links.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lt=post_id))
+    rows = list(links.order_by("-created_at", "-post_id").values_list("post_id", "created_at")[: first + 1])
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+
+    posts = Post.objects.visible().select_related("author").in_bulk([post_id for post_id, _ in rows])
+    connection = PostNode._meta.connection
+    edges = [
+        connection.Edge(node=posts[post_id], cursor=encode_watermark(created_at, post_id))
+        for post_id, created_at in rows
+        if post_id in posts  # deleted since they were indexed
+    ]
+    return connection(
+        edges=edges,
+        page_info=relay.PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            # the last link read, so hidden posts at the end aren't read again
+            end_cursor=encode_watermark(rows[-1][1], rows[-1][0]) if rows else after,
+            has_previous_page=bool(after),
+            has_next_page=has_next_page,
+        ),
+    )
+
+
+def decode_post_id(post_id):
+    """Turn a PostNode global ID into a raw primary key."""
+    try:
+        node_type, raw_post_id = from_global_id(post_id)
+        raw_post_id = uuid.UUID(raw_post_id)
+    except Exception:
+        raise Exception("Invalid post ID format")
+    if node_type != "PostNode":
+        raise Exception("Invalid post ID")
+    return raw_post_id
+
 # ---------------- Mutations ----------------
 class CreatePost(graphene.Mutation):
     post = graphene.Field(PostNode)
 
     class Arguments:
         content = graphene.String(required=True)
+        # or send an Idempotency-Key header; retries replay the first result
+        idempotency_key = graphene.String()
 
+    @idempotent
     def mutate(self, info, content):
         user = info.context.user
         if not getattr(user, "is_authenticated", False):
             raise Exception("Authentication required")
-        post = Post.objects.create(author=user, content=content)
+        with transaction.atomic():
+            post = Post.objects.create(author=user, content=content)
+            user.bump_counters(posts_count=1)
         return CreatePost(post=post)
 
+class UpdatePost(graphene.Mutation):
+    post = graphene.Field(PostNode)
+
+    class Arguments:
+        post_id = graphene.ID(required=True)
+        content = graphene.String(required=True)
+
+    def mutate(self, info, post_id, content):
+        user = info.context.user
+        if not getattr(user, "is_authenticated", False):
+            raise Exception("Authentication required")
+        try:
+            post = Post.objects.visible().get(pk=decode_post_id(post_id))
+        except Post.DoesNotExist:
+            raise Exception("Post not found")
+        if post.author_id != user.pk:
+            raise Exception("You can only edit your own posts")
+        post.content = content
+        post.content_updated_at = timezone.now()
+        # tags and mentions are re-indexed by the post_save signal
+        post.save(update_fields=["content", "content_updated_at", "updated_at"])
+        return UpdatePost(post=post)
+
+class DeletePost(graphene.Mutation):
+    success = graphene.Boolean()
+
+    class Arguments:
+        post_id = graphene.ID(required=True)
+
+    def mutate(self, info, post_id):
+        user = info.context.user
+        if not getattr(user, "is_authenticated", False):
+            raise Exception("Authentication required")
+        posts = Post.objects.visible().filter(pk=decode_post_id(post_id))
+        author_id = posts.values_list("author_id", flat=True).first()
+        if author_id is None:
+            raise Exception("Post not found")
+        if author_id != user.pk:
+            raise Exception("You can only delete your own posts")
+        # hidden right away; comments and interactions are purged by a job
+        soft_delete_posts(posts)
+        return DeletePost(success=True)
+
 class AddComment(graphene.Mutation):
     comment = graphene.Field(CommentNode)
 
     class Arguments:
         post_id = graphene.ID(required=True)
         content = graphene.String(required=True)
+        idempotency_key = graphene.String()
 
+    @idempotent
     def mutate(self, info, post_id, content):
         user = info.context.user
         if not user.is_authenticated:
@@ -94,11 +339,18 @@ class AddComment(graphene.Mutation):
         except Exception:
             raise Exception("Invalid post ID format")
             
-        post = Post.objects.get(pk=raw_post_id)
-        comment = Comment.objects.create(post=post, author=user, content=content)
-        # Update denormalized counter
-        post.comments_count = post.comments.count()
-        post.save(update_fields=["comments_count"])
+        try:
+            post = Post.objects.visible().get(pk=raw_post_id)
+        except Post.DoesNotExist:
+            raise Exception("Post not found")
+        with transaction.atomic():
+            comment = Comment.objects.create(post=post, author=user, content=content)
+            # Counters stay in the request (one UPDATE each) so the
+            # commenter reads their own write; hot posts shard them
+            post.bump_counters(comments_count=1)
+            user.bump_counters(comments_count=1)
+        transaction.on_commit(lambda: publish_comment_added(comment, user.username))
+        transaction.on_commit(lambda: publish_post_counters(post.pk))
         return AddComment(comment=comment)
 
 
@@ -114,7 +366,8 @@ class InteractWithPost(graphene.Mutation):
         if not user.is_authenticated:
             raise Exception("Authentication required")
 
-        if type not in ["like", "share"]:
+        interaction_type = Interaction.TYPE_BY_NAME.get(type)
+        if interaction_type is None:
             raise Exception("Invalid interaction type")
 
         # Handle Relay Node ID decoding
@@ -135,24 +388,41 @@ class InteractWithPost(graphene.Mutation):
             raise Exception(f"Failed to decode Node ID: {str(e)}")
 
         try:
-            post = Post.objects.get(pk=raw_post_id)
+            post = Post.objects.visible().get(pk=raw_post_id)
         except Post.DoesNotExist:
             raise Exception(f"Post with ID {raw_post_id} not found")
         except Exception as e:
             raise Exception(f"Error finding post: {str(e)}")
 
-        interaction, created = Interaction.objects.get_or_create(
-            post=post, user=user, type=type
-        )
+        # interactions on posts older than the retention window may have been
+        # archived; they still count as existing so likes don't double up
+        cutoff = retention_cutoff()
+        if cutoff is not None and post.created_at < cutoff:
+            archived = ArchivedInteraction.objects.filter(
+                post=post, user=user, type=interaction_type
+            ).first()
+            if archived is not None:
+                return InteractWithPost(interaction=Interaction(
+                    id=archived.id, post=post, user=user,
+                    type=archived.type, created_at=archived.created_at,
+                ))
 
-        # Fetch like/share counts in a single query
-        counts = post.interactions.aggregate(
-            likes=Count('id', filter=Q(type='like')),
-            shares=Count('id', filter=Q(type='share'))
-        )
-        post.likes_count = counts['likes']
-        post.shares_count = counts['shares']
-        post.save(update_fields=["likes_count", "shares_count"])
+        with transaction.atomic():
+            interaction, created = Interaction.objects.get_or_create(
+                post=post, user=user, type=interaction_type
+            )
+            if created:
+                # Increment rather than recount: raw rows can be archived away.
+                # Kept in the request so the client reads its own like.
+                counter = "likes_count" if interaction_type == Interaction.LIKE else "shares_count"
+                sharded = post.bump_counters(**{counter: 1})
+                # for sharded posts the likes reach the author when the shards are folded
+                if interaction_type == Interaction.LIKE and not sharded:
+                    # only the pk is needed to run the counter UPDATE
+                    User(pk=post.author_id).bump_counters(likes_received_count=1)
+                # the daily rollup is updated by a worker, off the request path
+                enqueue("posts.record_interaction", {"interaction_id": interaction.pk})
+                transaction.on_commit(lambda: publish_post_counters(post.pk))
 
         return InteractWithPost(interaction=interaction)
     
@@ -166,6 +436,22 @@ class Query(graphene.ObjectType):
     comments = DjangoFilterConnectionField(CommentNode)
     interaction = relay.Node.Field(InteractionNode)
     interactions = DjangoFilterConnectionField(InteractionNode)
+    posts_by_tag = relay.ConnectionField(PostNode._meta.connection, tag=graphene.String(required=True))
+    mentions_of = relay.ConnectionField(PostNode._meta.connection, username=graphene.String(required=True))
+    profile = graphene.Field(UserSummaryType, username=graphene.String(required=True))
+    changes_since = graphene.Field(
+        PostChangesType,
+        watermark=graphene.String(),
+        first=graphene.Int(default_value=100),
+        # the posts the client shows; only staff may sync the whole site
+        ids=graphene.List(graphene.NonNull(graphene.ID)),
+    )
+    post_engagement = graphene.List(
+        PostEngagementDay,
+        post_id=graphene.ID(required=True),
+        from_=graphene.Date(name="from"),
+        to=graphene.Date(),
+    )
 
     def resolve_posts(self, info, **kwargs):
         # Efficiently fetch author, comments, and interactions
@@ -174,8 +460,152 @@ class Query(graphene.ObjectType):
             Prefetch("interactions", queryset=Interaction.objects.select_related("user"))
         ).all()
 
+    def resolve_posts_by_tag(self, info, tag, **kwargs):
+        return link_feed(PostTag.objects.filter(tag=normalize_tag(tag)), **kwargs)
+
+    def resolve_profile(self, info, username):
+        # the stats are denormalized onto the user row: one indexed read
+        return User.objects.filter(username=username, deleted_at__isnull=True).first()
+
+    def resolve_mentions_of(self, info, username, **kwargs):
+        user = User.objects.filter(username=username, deleted_at__isnull=True).only("id").first()
+        if user is None:
+            return link_feed(PostMention.objects.none(), **kwargs)
+        return link_feed(PostMention.objects.filter(user=user), **kwargs)
+
+    def resolve_changes_since(self, info, watermark=None, first=100, ids=None):
+        first = max(1, min(first, 500))
+        if ids is None:
+            if not info.context.user.is_staff:
+                raise Exception("ids is required")
+            posts = Post.objects.all()
+        else:
+            if len(ids) > CHANGES_SINCE_MAX_IDS:
+                raise Exception(f"At most {CHANGES_SINCE_MAX_IDS} ids")
+            posts = Post.objects.filter(pk__in=[decode_post_id(id) for id in ids])
+        # Rows stamped in the last few seconds may belong to transactions that
+        # haven't committed yet; leave them for the next poll so the
+        # watermark never skips past them.
+        settled = timezone.now() - timedelta(
+            seconds=getattr(settings, "CHANGES_SINCE_SETTLE_SECONDS", 2)
+        )
+        if watermark is None:
+            # first sync: the client already has the current state
+            return PostChangesType(
+                changes=[], watermark=encode_watermark(settled, uuid.UUID(int=0)), has_more=False
+            )
+
+        since, last_pk = decode_watermark(watermark)
+        rows = list(
+            posts.filter(
+                Q(updated_at__gt=since) | Q(updated_at=since, pk__gt=last_pk),
+                updated_at__lte=settled,
+            )
+            .order_by("updated_at", "pk")
+            .annotate(changed_content=Case(
+                When(content_updated_at__gt=since, then=F("content")),
+                default=None,
+            ))
+            .values(
+                "pk", "likes_count", "comments_count", "shares_count",
+                "changed_content", "deleted_at", "author__deleted_at", "updated_at",
+                "sharded_counters",
+            )[: first + 1]
+        )
+        for row in rows:
+            if row["sharded_counters"]:
+                row.update(sharded_totals(row["pk"], cached=False))
+        has_more = len(rows) > first
+        rows = rows[:first]
+
+        if rows:
+            new_watermark = encode_watermark(rows[-1]["updated_at"], rows[-1]["pk"])
+        elif since < settled:
+            new_watermark = encode_watermark(settled, uuid.UUID(int=0))
+        else:
+            new_watermark = watermark
+
+        return PostChangesType(
+            changes=[
+                PostChangeType(
+                    id=to_global_id("PostNode", row["pk"]),
+                    likes_count=row["likes_count"],
+                    comments_count=row["comments_count"],
+                    shares_count=row["shares_count"],
+                    content=row["changed_content"],
+                    # a deleted user's posts go with them
+                    deleted=row["deleted_at"] is not None or row["author__deleted_at"] is not None,
+                    updated_at=row["updated_at"],
+                )
+                for row in rows
+            ],
+            watermark=new_watermark,
+            has_more=has_more,
+        )
+
+    def resolve_post_engagement(self, info, post_id, from_=None, to=None):
+        # Reads only the daily rollup, never posts_interaction
+        to = to or timezone.localdate()
+        from_ = from_ or to - timedelta(days=30)
+        if from_ > to:
+            raise Exception("'from' must not be after 'to'")
+        if (to - from_).days > 366:
+            raise Exception("Engagement range is limited to one year")
+
+        rows = DailyPostEngagement.objects.filter(
+            post_id=decode_post_id(post_id), day__gte=from_, day__lte=to
+        ).order_by("day").values_list("day", "type", "count")
+
+        days = {}
+        for day, type, count in rows:
+            entry = days.setdefault(day, PostEngagementDay(day=day, likes=0, shares=0))
+            if type == Interaction.LIKE:
+                entry.likes = count
+            else:
+                entry.shares = count
+        return list(days.values())
+
+# ---------------- Subscriptions ----------------
+async def visible_post_stream(post_id, topic):
+    if not await Post.objects.visible().filter(pk=post_id).aexists():
+        raise Exception("Post not found")
+    return topic_stream(topic(post_id))
+
+
+async def topic_stream(topic):
+    subscription = broker.subscribe(topic)
+    try:
+        async for payload in subscription:
+            yield payload
+    finally:
+        subscription.close()
+
+
+class Subscription(graphene.ObjectType):
+    post_updated = graphene.Field(PostCountersType, id=graphene.ID(required=True))
+    comment_added = graphene.Field(CommentAddedType, post_id=graphene.ID(required=True))
+
+    # Payloads are built in the publishing mutation, so the database is only
+    # read once, when subscribing. The ID and the post are checked before
+    # the stream starts, so a bad or deleted one is an error response to
+    # the subscribe.
+    def subscribe_post_updated(root, info, id):
+        return visible_post_stream(decode_post_id(id), post_topic)
+
+    def subscribe_comment_added(root, info, post_id):
+        return visible_post_stream(decode_post_id(post_id), comments_topic)
+
+    def resolve_post_updated(root, info, id):
+        return root
+
+    def resolve_comment_added(root, info, post_id):
+        return root
+
+
 class Mutation(graphene.ObjectType):
     create_post = CreatePost.Field()
+    update_post = UpdatePost.Field()
+    delete_post = DeletePost.Field()
     add_comment = AddComment.Field()
     interact_with_post = InteractWithPost.Field()
 
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from jobs.api import enqueue
+from .models import Post
+
+
+@receiver(post_save, sender=Post)
+def index_post_links(sender, instance, created, update_fields=None, **kwargs):
+    # Counter-only saves don't touch content, so skip re-parsing for them
+    if not created and update_fields is not None and "content" not in update_fields:
+        return
+    # The worker reads the post's latest content, so one queued job per post
+    # covers any number of edits made before it runs
+    enqueue(
+        "posts.index_post_links",
+        {"post_id": str(instance.pk), "replace": not created},
+        dedupe_key=f"posts.index_post_links:{instance.pk}",
+    )
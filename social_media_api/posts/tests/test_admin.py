@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.admin import PostAdmin
+from posts.models import Post
+from users.admin import UserAdmin
+
+User = get_user_model()
+
+
+class KeysetChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="pw")
+        self.client.force_login(self.admin)
+
+    def walk(self, url):
+        """The pks shown on every page reached through the Older links."""
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [obj.pk for obj in response.context["cl"].result_list]
+            next_url = response.context.get("keyset_next_url")
+            url = next_url and url.split("?")[0] + next_url
+        return seen
+
+    @mock.patch.object(PostAdmin, "list_per_page", 2)
+    def test_posts_sharing_a_timestamp_are_not_skipped(self):
+        for _ in range(5):
+            Post.objects.create(author=self.admin, content="hello")
+        Post.objects.update(created_at=timezone.now())
+
+        expected = sorted(Post.objects.values_list("pk", flat=True), reverse=True)
+        self.assertEqual(self.walk("/admin/posts/post/"), expected)
+
+    @mock.patch.object(UserAdmin, "list_per_page", 2)
+    def test_users_sharing_date_joined_are_not_skipped(self):
+        for n in range(4):
+            User.objects.create_user(email=f"u{n}@example.com", username=f"u{n}", password="pw")
+        User.objects.update(date_joined=timezone.now())
+
+        expected = sorted(User.objects.values_list("pk", flat=True), reverse=True)
+        self.assertEqual(self.walk("/admin/users/user/"), expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/admin/posts/post/?older_than=garbage")
+        self.assertRedirects(response, "/admin/posts/post/?e=1", fetch_redirect_response=False)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from jobs.models import Job
+from posts import counters
+from posts.jobs import fold_counter_shards
+from posts.models import Post, PostCounterShard
+
+User = get_user_model()
+
+
+@override_settings(POST_COUNTER_HOT_WRITES=3, POST_COUNTER_SHARDS=4)
+class ShardedCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+        self.post = Post.objects.create(author=self.author, content="hello")
+
+    def like(self, times=1):
+        for _ in range(times):
+            post = Post.objects.get(pk=self.post.pk)
+            post.bump_counters(likes_count=1)
+
+    def test_hot_post_is_promoted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.like(2)
+            self.post.refresh_from_db()
+            self.assertFalse(self.post.sharded_counters)
+            self.like()
+
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.sharded_counters)
+        self.assertEqual(self.post.likes_count, 3)
+        self.assertEqual(PostCounterShard.objects.filter(post=self.post).count(), 4)
+        self.assertEqual(Job.objects.get().name, "posts.fold_counter_shards")
+
+    def test_shard_writes_reach_totals_and_are_folded(self):
+        counters.promote(self.post.pk)
+        self.like(5)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)  # the row lock isn't touched
+        self.assertEqual(sum(PostCounterShard.objects.values_list("likes_count", flat=True)), 5)
+        self.assertEqual(counters.sharded_totals(self.post.pk)["likes_count"], 5)
+        self.assertEqual(counters.counter_value(self.post, "likes_count"), 5)
+
+        # cached totals lag behind until read with cached=False
+        self.like()
+        self.assertEqual(counters.sharded_totals(self.post.pk)["likes_count"], 5)
+        self.assertEqual(counters.sharded_totals(self.post.pk, cached=False)["likes_count"], 6)
+
+        # still hot: folded into the row and stays sharded
+        with self.captureOnCommitCallbacks(execute=True):
+            fold_counter_shards(str(self.post.pk))
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertTrue(self.post.sharded_counters)
+        self.assertEqual(self.post.likes_count, 6)
+        self.assertEqual(self.author.likes_received_count, 6)
+        self.assertEqual(sum(PostCounterShard.objects.values_list("likes_count", flat=True)), 0)
+        self.assertEqual(counters.sharded_totals(self.post.pk)["likes_count"], 6)
+        self.assertEqual(Job.objects.get().name, "posts.fold_counter_shards")
+
+        # cooled down: back to row counters
+        self.like()
+        self.assertFalse(counters.fold(self.post.pk))
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.sharded_counters)
+        self.assertEqual(self.post.likes_count, 7)
+        self.assertFalse(PostCounterShard.objects.exists())
+        self.like()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 8)
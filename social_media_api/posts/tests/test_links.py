@@ -0,0 +1,79 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from graphql_relay import to_global_id
+
+from posts.hashtags import extract_mentions, extract_tags, normalize_tag, sync_post_links
+from posts.models import Post, PostTag
+
+User = get_user_model()
+
+
+class ExtractTests(SimpleTestCase):
+    def test_tags(self):
+        self.assertEqual(extract_tags("#Django and #django, (#orm)"), {"django", "orm"})
+        self.assertEqual(extract_tags("x#not"), set())
+
+    def test_url_fragments_and_entities_are_not_tags(self):
+        self.assertEqual(extract_tags("see https://example.com/a/#section"), set())
+        self.assertEqual(extract_tags("&#123; and &#x7b;"), set())
+
+    def test_over_long_tag_is_not_cut_short(self):
+        self.assertEqual(extract_tags("#" + "a" * 64), {"a" * 64})
+        self.assertEqual(extract_tags("#" + "a" * 70), set())
+
+    def test_mentions(self):
+        self.assertEqual(extract_mentions("hi @alice, @bob. and @carol-"), {"alice", "bob", "carol"})
+        self.assertEqual(extract_mentions("@" + "a" * 51), set())
+
+    def test_emails_and_urls_are_not_mentions(self):
+        self.assertEqual(extract_mentions("mail a@b.c or x.@y"), set())
+        self.assertEqual(extract_mentions("https://example.com/@alice"), set())
+
+    def test_normalize_tag(self):
+        self.assertEqual(normalize_tag("#Django"), "django")
+        self.assertEqual(normalize_tag("ORM"), "orm")
+
+
+class LinkFeedTests(TestCase):
+    query = """
+        query($tag: String!, $first: Int, $after: String) {
+            postsByTag(tag: $tag, first: $first, after: $after) {
+                edges { node { id } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+        self.posts = [Post.objects.create(author=user, content="#same") for _ in range(5)]
+        sync_post_links(self.posts, replace=False)
+        # one timestamp for all, so only the post id orders them
+        PostTag.objects.update(created_at=timezone.now())
+
+    def page(self, after=None):
+        response = self.client.post(
+            "/graphql/",
+            json.dumps({"query": self.query, "variables": {"tag": "#Same", "first": 2, "after": after}}),
+            content_type="application/json",
+        )
+        result = response.json()
+        self.assertNotIn("errors", result)
+        return result["data"]["postsByTag"]
+
+    def test_pages_through_equal_timestamps(self):
+        seen, after, pages = [], None, 0
+        while True:
+            page = self.page(after)
+            pages += 1
+            seen += [edge["node"]["id"] for edge in page["edges"]]
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+
+        self.assertEqual(pages, 3)
+        expected = sorted(self.posts, key=lambda post: post.pk, reverse=True)
+        self.assertEqual(seen, [to_global_id("PostNode", post.pk) for post in expected])
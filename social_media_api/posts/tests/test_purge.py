@@ -0,0 +1,116 @@
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from graphql_jwt.shortcuts import get_token
+from graphql_relay import to_global_id
+
+from posts.models import Comment, Interaction, Post
+from posts.purge import purge_user_rows, soft_delete_users
+
+User = get_user_model()
+
+
+@override_settings(CHANGES_SINCE_SETTLE_SECONDS=0)
+class PurgeUserTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+        self.bob = User.objects.create_user(email="bob@example.com", username="bob", password="pw")
+        self.carol = User.objects.create_user(email="carol@example.com", username="carol", password="pw")
+
+        self.post_a = self.create_post(self.alice)
+        self.post_b = self.create_post(self.bob)
+        self.post_c = self.create_post(self.carol)
+
+        # carol likes, shares and comments on other people's posts
+        self.interact(self.carol, self.post_a, "like")
+        self.interact(self.carol, self.post_b, "share")
+        self.comment(self.carol, self.post_a)
+        self.comment(self.carol, self.post_a)
+        self.comment(self.carol, self.post_b)
+        # others engage with her post, and with alice's
+        self.interact(self.alice, self.post_c, "like")
+        self.comment(self.alice, self.post_c)
+        self.comment(self.bob, self.post_c)
+        self.interact(self.bob, self.post_a, "like")
+        self.comment(self.bob, self.post_a)
+
+    def gql(self, user, query, variables=None):
+        response = self.client.post(
+            "/graphql/",
+            json.dumps({"query": query, "variables": variables or {}}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"JWT {get_token(user)}" if user else "",
+        )
+        result = response.json()
+        self.assertNotIn("errors", result)
+        return result["data"]
+
+    def create_post(self, user):
+        self.gql(user, 'mutation { createPost(content: "hello") { post { id } } }')
+        return Post.objects.filter(author=user).latest("created_at")
+
+    def interact(self, user, post, type):
+        self.gql(
+            user,
+            "mutation($p: ID!, $t: String!) { interactWithPost(postId: $p, type: $t) { interaction { id } } }",
+            {"p": to_global_id("PostNode", post.pk), "t": type},
+        )
+
+    def comment(self, user, post):
+        self.gql(
+            user,
+            'mutation($p: ID!) { addComment(postId: $p, content: "hi") { comment { id } } }',
+            {"p": to_global_id("PostNode", post.pk)},
+        )
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual({field: getattr(obj, field) for field in expected}, expected, obj)
+
+    def test_counters_after_purging_a_user(self):
+        soft_delete_users(User.objects.filter(pk=self.carol.pk))
+        self.assertTrue(purge_user_rows(self.carol.pk, batch_size=2))
+
+        self.assertFalse(User.objects.filter(pk=self.carol.pk).exists())
+        self.assertFalse(Post.objects.filter(pk=self.post_c.pk).exists())
+        self.assertFalse(Interaction.objects.filter(user=self.carol).exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.post_c.pk).exists())
+
+        self.assertCounters(self.post_a, likes_count=1, shares_count=0, comments_count=1)
+        self.assertCounters(self.post_b, likes_count=0, shares_count=0, comments_count=0)
+        self.assertCounters(self.alice, posts_count=1, comments_count=0, likes_received_count=1)
+        self.assertCounters(self.bob, posts_count=1, comments_count=1, likes_received_count=0)
+
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("posts: found drift in 0 of 2", out.getvalue())
+        self.assertIn("users: found drift in 0 of 2", out.getvalue())
+
+    def test_purge_in_resumable_runs(self):
+        soft_delete_users(User.objects.filter(pk=self.carol.pk))
+        runs = 1
+        while not purge_user_rows(self.carol.pk, batch_size=1, max_batches=2):
+            runs += 1
+        self.assertGreater(runs, 1)
+        self.assertCounters(self.post_a, likes_count=1, shares_count=0, comments_count=1)
+        self.assertCounters(self.post_b, likes_count=0, shares_count=0, comments_count=0)
+        self.assertCounters(self.alice, posts_count=1, comments_count=0, likes_received_count=1)
+        self.assertCounters(self.bob, posts_count=1, comments_count=1, likes_received_count=0)
+
+    def test_deleted_users_posts_reach_delta_sync_as_deleted(self):
+        query = """
+            query($w: String, $ids: [ID!]) {
+                changesSince(watermark: $w, ids: $ids) { watermark changes { id deleted } }
+            }
+        """
+        ids = [to_global_id("PostNode", post.pk) for post in (self.post_a, self.post_c)]
+        watermark = self.gql(self.bob, query, {"ids": ids})["changesSince"]["watermark"]
+        soft_delete_users(User.objects.filter(pk=self.carol.pk))
+        # the first batch only stamps her posts
+        purge_user_rows(self.carol.pk, max_batches=1)
+
+        changes = self.gql(self.bob, query, {"w": watermark, "ids": ids})["changesSince"]["changes"]
+        self.assertEqual(changes, [{"id": to_global_id("PostNode", self.post_c.pk), "deleted": True}])
@@ -0,0 +1,46 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.management.commands import reconcile_counters
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ReconcileCountersTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+        self.post = Post.objects.create(author=self.alice, content="hello", comments_count=5)
+
+    def add_comment(self):
+        Comment.objects.create(post=self.post, author=self.alice, content="hi")
+        Post(pk=self.post.pk).bump_counters(comments_count=1)
+
+    def test_fix_recounts_under_the_lock(self):
+        real = reconcile_counters.actual_post_counters
+        calls = []
+
+        def actual_with_a_write_in_between(post_ids):
+            # a comment lands after the stored counters were read
+            if not calls:
+                self.add_comment()
+            calls.append(post_ids)
+            return real(post_ids)
+
+        with mock.patch.object(reconcile_counters, "actual_post_counters", actual_with_a_write_in_between):
+            call_command("reconcile_counters", "--fix", "--only", "posts", stdout=io.StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(len(calls), 2)
+
+    def test_report_only(self):
+        out = io.StringIO()
+        call_command("reconcile_counters", "--only", "posts", stdout=out)
+        self.assertIn("posts: found drift in 1 of 1", out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from graphql_relay import to_global_id
+
+from posts.models import Post
+from posts.pubsub import Broker, broker, post_topic
+from posts.schema import PostCountersType
+from social_media_api.schema import schema
+from social_media_api.websocket import GRAPHQL_TRANSPORT_WS, GraphQLWebSocketApp
+
+User = get_user_model()
+
+
+async def settle():
+    # deliveries hop onto the loop with call_soon_threadsafe
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def drain(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+class BrokerTests(SimpleTestCase):
+    async def test_fan_out_to_every_subscriber_of_the_topic(self):
+        broker = Broker(coalesce_seconds=0)
+        first, second = broker.subscribe("a"), broker.subscribe("a")
+        other = broker.subscribe("b")
+        broker.publish("a", 1)
+        await settle()
+        self.assertEqual(drain(first), [1])
+        self.assertEqual(drain(second), [1])
+        self.assertEqual(drain(other), [])
+
+    async def test_coalesce_delivers_only_the_latest_payload(self):
+        broker = Broker(coalesce_seconds=0.05)
+        subscription = broker.subscribe("a")
+        for n in (1, 2, 3):
+            broker.publish("a", n, coalesce=True)
+        await settle()
+        self.assertEqual(drain(subscription), [])
+        await asyncio.sleep(0.1)
+        self.assertEqual(drain(subscription), [3])
+
+    async def test_full_queue_drops_the_oldest_payload(self):
+        broker = Broker(coalesce_seconds=0, queue_size=2)
+        subscription = broker.subscribe("a")
+        for n in (1, 2, 3):
+            broker.publish("a", n)
+        await settle()
+        self.assertEqual(drain(subscription), [2, 3])
+
+    async def test_closed_subscription_gets_nothing(self):
+        broker = Broker(coalesce_seconds=0)
+        subscription = broker.subscribe("a")
+        subscription.close()
+        self.assertFalse(broker.has_subscribers("a"))
+        broker.publish("a", 1)
+        await settle()
+        self.assertEqual(drain(subscription), [])
+
+    def test_coalesce_survives_a_closed_loop(self):
+        broker = Broker(coalesce_seconds=0.01)
+
+        async def subscribe():
+            return broker.subscribe("a")
+
+        dead_loop = asyncio.new_event_loop()
+        dead_loop.run_until_complete(subscribe())
+        dead_loop.close()
+        broker.publish("a", 1, coalesce=True)
+        self.assertFalse(broker.has_subscribers("a"))
+
+        # the topic isn't left pending: new subscribers still get updates
+        async def live():
+            subscription = broker.subscribe("a")
+            broker.publish("a", 2, coalesce=True)
+            await asyncio.sleep(0.05)
+            return drain(subscription)
+
+        self.assertEqual(asyncio.run(live()), [2])
+
+
+class WebSocketClient:
+    """Drives GraphQLWebSocketApp through in-memory ASGI queues."""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {"type": "websocket", "path": "/graphql/", "subprotocols": [GRAPHQL_TRANSPORT_WS]}
+        self.task = asyncio.create_task(
+            GraphQLWebSocketApp(schema)(scope, self.incoming.get, self.outgoing.put)
+        )
+
+    async def send(self, message):
+        await self.incoming.put({"type": "websocket.receive", "text": json.dumps(message)})
+
+    async def receive(self):
+        message = await asyncio.wait_for(self.outgoing.get(), timeout=2)
+        return json.loads(message["text"]) if message["type"] == "websocket.send" else message
+
+    async def connect(self):
+        await self.incoming.put({"type": "websocket.connect"})
+        accepted = await self.receive()
+        if accepted["type"] != "websocket.accept":
+            raise AssertionError(f"connection refused: {accepted}")
+        await self.send({"type": "connection_init"})
+        return await self.receive()
+
+    async def disconnect(self):
+        await self.incoming.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(self.task, timeout=2)
+
+
+class GraphQLTransportWSTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+        self.post = Post.objects.create(author=author, content="hello")
+
+    async def subscribe_post_updated(self, client, global_id):
+        await client.send({
+            "id": "1",
+            "type": "subscribe",
+            "payload": {
+                "query": "subscription($id: ID!) { postUpdated(id: $id) { id likesCount } }",
+                "variables": {"id": global_id},
+            },
+        })
+
+    async def test_post_updated_round_trip(self):
+        post_id = self.post.pk
+        global_id = to_global_id("PostNode", post_id)
+        client = WebSocketClient()
+        self.assertEqual(await client.connect(), {"type": "connection_ack"})
+        await self.subscribe_post_updated(client, global_id)
+        for _ in range(200):
+            if broker.has_subscribers(post_topic(post_id)):
+                break
+            await asyncio.sleep(0.01)
+
+        broker.publish(post_topic(post_id), PostCountersType(
+            id=global_id, likes_count=3, comments_count=0, shares_count=0,
+        ))
+        self.assertEqual(await client.receive(), {
+            "id": "1",
+            "type": "next",
+            "payload": {"data": {"postUpdated": {"id": global_id, "likesCount": 3}}},
+        })
+
+        await client.send({"id": "1", "type": "complete"})
+        await client.disconnect()
+        self.assertFalse(broker.has_subscribers(post_topic(post_id)))
+
+    async def test_invalid_id_is_an_error_message(self):
+        client = WebSocketClient()
+        await client.connect()
+        await client.send({
+            "id": "1",
+            "type": "subscribe",
+            "payload": {"query": 'subscription { postUpdated(id: "garbage") { id } }'},
+        })
+        message = await client.receive()
+        self.assertEqual((message["id"], message["type"]), ("1", "error"))
+        self.assertEqual(message["payload"][0]["message"], "Invalid post ID format")
+        await client.disconnect()
+
+    async def test_deleted_post_is_an_error_message(self):
+        await Post.objects.filter(pk=self.post.pk).aupdate(deleted_at=timezone.now())
+        client = WebSocketClient()
+        await client.connect()
+        await self.subscribe_post_updated(client, to_global_id("PostNode", self.post.pk))
+        message = await client.receive()
+        self.assertEqual((message["id"], message["type"]), ("1", "error"))
+        self.assertEqual(message["payload"][0]["message"], "Post not found")
+        self.assertFalse(broker.has_subscribers(post_topic(self.post.pk)))
+        await client.disconnect()
@@ -2,6 +2,8 @@
 ASGI config for social_media_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections to /graphql/ serve GraphQL
+subscriptions.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since the schema pulls in models
+from social_media_api.schema import schema  # noqa: E402
+from social_media_api.websocket import GraphQLWebSocketApp  # noqa: E402
+
+graphql_ws_application = GraphQLWebSocketApp(schema)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        if scope["path"].rstrip("/") == "/graphql":
+            return await graphql_ws_application(scope, receive, send)
+        await receive()  # websocket.connect
+        return await send({"type": "websocket.close", "code": 4404})
+    return await django_application(scope, receive, send)
@@ -0,0 +1,157 @@
+"""
+Idempotency keys for GraphQL mutations.
+
+A client sends the same key (the ``Idempotency-Key`` header or an
+``idempotencyKey`` argument) when it retries a mutation. The first execution
+stores its payload in a bounded, TTL'd cache, with model instances reduced
+to their primary keys; replays load those rows again instead of running the
+resolver, and duplicates that arrive while the first is still running wait for
+it instead of running again.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from graphql import GraphQLError
+
+from .ratelimit import client_identity
+
+_MISSING = object()
+
+
+def dump_payload(payload):
+    """A mutation payload as its class, plain field values and model (label, pk)s."""
+    values, rows = {}, {}
+    for name in payload._meta.fields:
+        value = getattr(payload, name, None)
+        if isinstance(value, models.Model):
+            rows[name] = (value._meta.label, value.pk)
+        else:
+            values[name] = value
+    return type(payload), values, rows
+
+
+def load_payload(stored):
+    payload_class, values, rows = stored
+    for name, (label, pk) in rows.items():
+        values[name] = apps.get_model(label)._default_manager.filter(pk=pk).first()
+    return payload_class(**values)
+
+
+class IdempotencyStore:
+    def __init__(self, cache, ttl, wait_timeout, poll_interval=0.05, dump=None, load=None):
+        self.cache = cache
+        # what is stored for a payload, and how it is turned back
+        self.dump = dump or (lambda payload: payload)
+        self.load = load or (lambda stored: stored)
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def cached(self, key, fingerprint):
+        entry = self.cache.get(f"{key}:result")
+        if entry is None:
+            return _MISSING
+        stored_fingerprint, stored = entry
+        if stored_fingerprint != fingerprint:
+            raise GraphQLError(
+                "Idempotency key was already used with different arguments",
+                extensions={"code": "IDEMPOTENCY_KEY_REUSED"},
+            )
+        return self.load(stored)
+
+    def wait_for(self, key, fingerprint, event=None):
+        """Wait for another execution of key to finish and return its payload."""
+        deadline = time.monotonic() + self.wait_timeout
+        if event is not None:
+            # same process: woken as soon as the owner finishes
+            event.wait(self.wait_timeout)
+        while True:
+            payload = self.cached(key, fingerprint)
+            if payload is not _MISSING:
+                return payload
+            if not self.cache.get(f"{key}:lock"):
+                return _MISSING  # the owner failed; caller may run it itself
+            if time.monotonic() >= deadline:
+                raise GraphQLError(
+                    "A request with this idempotency key is still in progress",
+                    extensions={"code": "IDEMPOTENCY_IN_PROGRESS"},
+                )
+            time.sleep(self.poll_interval)
+
+    def run(self, key, fingerprint, execute):
+        payload = self.cached(key, fingerprint)
+        if payload is not _MISSING:
+            return payload
+
+        with self.lock:
+            event = self.in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = self.in_flight[key] = threading.Event()
+        if not owner:
+            payload = self.wait_for(key, fingerprint, event)
+            if payload is not _MISSING:
+                return payload
+            return self.run(key, fingerprint, execute)
+
+        try:
+            # the cache lock covers duplicates arriving at other processes
+            while not self.cache.add(f"{key}:lock", 1, timeout=self.wait_timeout):
+                payload = self.wait_for(key, fingerprint)
+                if payload is not _MISSING:
+                    return payload
+            try:
+                payload = execute()
+                # errors aren't stored, so a failed attempt can be retried
+                self.cache.set(f"{key}:result", (fingerprint, self.dump(payload)), timeout=self.ttl)
+                return payload
+            finally:
+                self.cache.delete(f"{key}:lock")
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            event.set()
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(
+            cache=caches[getattr(settings, "IDEMPOTENCY_CACHE", "default")],
+            ttl=getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 24 * 3600),
+            wait_timeout=getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 10),
+            dump=dump_payload,
+            load=load_payload,
+        )
+    return _store
+
+
+def idempotent(mutate):
+    """
+    Decorate a graphene Mutation.mutate taking an optional idempotency_key
+    argument. Keys are scoped to the caller, the mutation field (alias
+    included) and the key itself.
+    """
+    @functools.wraps(mutate)
+    def wrapper(root, info, idempotency_key=None, **kwargs):
+        key = idempotency_key or info.context.META.get("HTTP_IDEMPOTENCY_KEY")
+        if not key:
+            return mutate(root, info, **kwargs)
+
+        scope = "|".join((client_identity(info.context), info.field_name, str(info.path.key), key))
+        cache_key = "idempotency:" + hashlib.sha256(scope.encode()).hexdigest()
+        fingerprint = hashlib.sha256(repr(sorted(kwargs.items())).encode()).hexdigest()
+        return get_store().run(cache_key, fingerprint, lambda: mutate(root, info, **kwargs))
+
+    return wrapper
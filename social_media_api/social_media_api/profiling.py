@@ -0,0 +1,222 @@
+"""
+Opt-in profiling of single /graphql/ requests.
+
+A request is profiled when it carries a valid X-GraphQL-Profile header (a
+signed token staff get from the profileToken query) or is picked by
+GRAPHQL_PROFILE_SAMPLE_RATE. While the operation executes, a background
+thread samples the request thread's stack every GRAPHQL_PROFILE_INTERVAL_MS
+(sys._current_frames), so the profiled code runs unmodified. Each profile is
+written to GRAPHQL_PROFILE_DIR as two files sharing a name:
+
+- <name>.collapsed: "frame;frame;frame count" lines, as read by
+  flamegraph.pl, speedscope and inferno
+- <name>.json: the operation, its variables and the user, which
+  `manage.py profile_query` replays against the local database
+
+Requests that aren't profiled only pay for a header lookup.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils import timezone
+from graphql import (
+    ArgumentNode,
+    GraphQLError,
+    ObjectFieldNode,
+    StringValueNode,
+    VariableNode,
+    Visitor,
+    get_operation_ast,
+    parse,
+    print_ast,
+    visit,
+)
+
+HEADER = "HTTP_X_GRAPHQL_PROFILE"
+SALT = "social_media_api.profiling"
+
+# arguments, input fields and variables with these names are never written
+# to disk
+SECRET_NAMES = re.compile(r"password|token|secret", re.IGNORECASE)
+
+
+def make_token(user):
+    """X-GraphQL-Profile header value for a staff user."""
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def token_user_id(token):
+    """The user a valid, unexpired token was issued to, else None."""
+    max_age = getattr(settings, "GRAPHQL_PROFILE_TOKEN_MAX_AGE", 3600)
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(token, max_age=max_age)
+    except signing.BadSignature:
+        return None
+
+
+def token_is_valid(token):
+    user_id = token_user_id(token)
+    # checked on every use, so revoking staff status revokes the token
+    return user_id is not None and get_user_model().objects.filter(
+        pk=user_id, is_staff=True, is_active=True, deleted_at__isnull=True
+    ).exists()
+
+
+def frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in (str(settings.BASE_DIR) + os.sep, "site-packages" + os.sep):
+        _, found, tail = filename.rpartition(prefix)
+        if found:
+            filename = tail
+            break
+    # ';' separates frames in the collapsed format
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """
+    Count the stacks of one thread, sampled from a background thread. Only
+    frames below the one that started the sampler are kept.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop = threading.Event()
+
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        self.root = sys._getframe(1)
+        self.stop.clear()
+        self.thread = threading.Thread(target=self.run, name="graphql-profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        self.thread.join()
+        self.root = None
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame is not self.root:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            del frame
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {
+            key: "[redacted]" if SECRET_NAMES.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+class SecretArgumentRedactor(Visitor):
+    """Blank out literal secret arguments and note the variables passed to them."""
+
+    def __init__(self):
+        super().__init__()
+        self.variables = set()
+
+    def redact_node(self, node, node_type):
+        if not SECRET_NAMES.search(node.name.value):
+            return None
+        if isinstance(node.value, VariableNode):
+            self.variables.add(node.value.name.value)
+            return None
+        return node_type(name=node.name, value=StringValueNode(value="[redacted]"))
+
+    def enter_argument(self, node, *args):
+        return self.redact_node(node, ArgumentNode)
+
+    def enter_object_field(self, node, *args):
+        return self.redact_node(node, ObjectFieldNode)
+
+
+def scrub(query, variables):
+    """The query and variables with passwords, tokens and secrets removed."""
+    variables = redact(variables or {})
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return query, variables
+    redactor = SecretArgumentRedactor()
+    query = print_ast(visit(document, redactor))
+    for name in redactor.variables & variables.keys():
+        variables[name] = "[redacted]"
+    return query, variables
+
+
+def safe_name(operation_name):
+    return re.sub(r"[^A-Za-z0-9_]", "", operation_name or "")[:64] or "anonymous"
+
+
+def save(sampler, operation_name, query, variables, user, elapsed, directory=None):
+    """Write the profile and its operation; returns the shared file name."""
+    directory = directory or settings.GRAPHQL_PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f"{timezone.now():%Y%m%dT%H%M%S}-{safe_name(operation_name)}-{uuid.uuid4().hex[:8]}"
+    with open(os.path.join(directory, f"{name}.collapsed"), "w") as f:
+        f.write(sampler.collapsed())
+    query, variables = scrub(query, variables)
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump({
+            "operationName": operation_name,
+            "query": query,
+            "variables": variables,
+            "user": str(user.pk) if user is not None and user.is_authenticated else None,
+            "elapsedMs": round(elapsed * 1000, 2),
+            "samples": sampler.samples,
+            "intervalMs": sampler.interval * 1000,
+        }, f, indent=2, default=str)
+    return name
+
+
+def operation_name_of(query, operation_name):
+    """The name of the operation that will run, for tagging the files."""
+    if operation_name:
+        return operation_name
+    try:
+        operation = get_operation_ast(parse(query))
+    except GraphQLError:
+        return None
+    return operation.name.value if operation is not None and operation.name else None
+
+
+def profile(request, execute, query, variables, operation_name):
+    """Run execute() under the sampler and save the result. Returns (result, name)."""
+    sampler = StackSampler(getattr(settings, "GRAPHQL_PROFILE_INTERVAL_MS", 5) / 1000)
+    began = time.perf_counter()
+    with sampler:
+        result = execute()
+    elapsed = time.perf_counter() - began
+    # read afterwards: the JWT middleware sets the user during execution
+    name = save(
+        sampler, operation_name_of(query, operation_name), query, variables,
+        getattr(request, "user", None), elapsed,
+    )
+    return result, name
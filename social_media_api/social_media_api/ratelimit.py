@@ -0,0 +1,183 @@
+"""
+Graphene middleware that rate limits and load-sheds root mutation fields.
+
+Rate limits are token buckets stored in a shared Django cache, keyed by the
+authenticated user (or client IP) and the mutation name, so every process
+enforces the same budget. Load shedding is per process: it bounds how many
+mutations may run at once, and bounds it harder while the database time of
+mutations is above the budget. Rejections are raised as GraphQL errors
+before the mutation resolver runs.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from graphql import GraphQLError, OperationType
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """'30/m' -> (30, 60): 30 requests per 60 seconds."""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period.strip().lower()[0]]
+
+
+class TokenBucket:
+    def __init__(self, cache, capacity, period, lock_wait=0.1):
+        self.cache = cache
+        self.capacity = capacity
+        self.refill_per_second = capacity / period
+        self.period = period
+        self.lock_wait = lock_wait
+
+    def take(self, key, now=None):
+        """
+        Take one token. Returns 0 when allowed, else the seconds until a
+        token is available. The read-modify-write holds a lock taken with
+        cache.add, which is atomic on shared backends, so concurrent requests
+        can't spend the same token.
+        """
+        lock = f"{key}:lock"
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock, 1, timeout=1):
+            if time.monotonic() >= deadline:
+                # one client racing itself; it can retry once the burst passes
+                return self.lock_wait
+            time.sleep(0.005)
+        try:
+            now = time.time() if now is None else now
+            tokens, updated = self.cache.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            if tokens < 1:
+                return (1 - tokens) / self.refill_per_second
+            self.cache.set(key, (tokens - 1, now), timeout=self.period)
+            return 0
+        finally:
+            self.cache.delete(lock)
+
+
+class QueryTimer:
+    """connection.execute_wrapper adding up the time spent in queries."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.monotonic() - start
+            self.queries += 1
+
+
+class LoadShedder:
+    def __init__(self, max_in_flight, overloaded_in_flight, latency_budget, smoothing=0.2):
+        self.max_in_flight = max_in_flight
+        self.overloaded_in_flight = overloaded_in_flight
+        self.latency_budget = latency_budget
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency = 0.0  # exponentially weighted mean of DB time, seconds
+        self.lock = threading.Lock()
+
+    @property
+    def overloaded(self):
+        return self.latency > self.latency_budget
+
+    def acquire(self):
+        with self.lock:
+            limit = self.overloaded_in_flight if self.overloaded else self.max_in_flight
+            if self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, db_time=None):
+        with self.lock:
+            self.in_flight -= 1
+            # mutations that didn't reach the database say nothing about it
+            if db_time is not None:
+                self.latency += self.smoothing * (db_time - self.latency)
+
+
+_shedder = None
+_shedder_lock = threading.Lock()
+
+
+def get_shedder():
+    # graphene builds a middleware instance per request, so the shedder
+    # that tracks in-flight work lives at module level
+    global _shedder
+    if _shedder is None:
+        with _shedder_lock:
+            if _shedder is None:
+                _shedder = LoadShedder(
+                    max_in_flight=getattr(settings, "GRAPHQL_MUTATION_MAX_IN_FLIGHT", 32),
+                    overloaded_in_flight=getattr(settings, "GRAPHQL_MUTATION_OVERLOADED_IN_FLIGHT", 4),
+                    latency_budget=getattr(settings, "GRAPHQL_MUTATION_LATENCY_BUDGET_MS", 500) / 1000,
+                )
+    return _shedder
+
+
+def client_identity(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    if getattr(settings, "GRAPHQL_RATE_LIMIT_TRUST_X_FORWARDED_FOR", False):
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+
+class RateLimitMiddleware:
+    """
+    Must be listed before graphql_jwt's JSONWebTokenMiddleware in
+    GRAPHENE["MIDDLEWARE"] so that the JWT middleware wraps it and
+    info.context.user is already authenticated here.
+    """
+
+    def __init__(self):
+        limits = getattr(settings, "GRAPHQL_RATE_LIMITS", {})
+        cache = caches[getattr(settings, "GRAPHQL_RATE_LIMIT_CACHE", "shared")]
+        if limits and isinstance(cache, LocMemCache):
+            # each process would keep its own buckets: N processes, N times the limit
+            raise ImproperlyConfigured("GRAPHQL_RATE_LIMIT_CACHE must be shared by all processes, not LocMemCache")
+        self.buckets = {name: TokenBucket(cache, *parse_rate(rate)) for name, rate in limits.items()}
+        self.default_bucket = self.buckets.pop("default", None)
+        self.shedder = get_shedder()
+
+    def resolve(self, next, root, info, **kwargs):
+        if info.path.prev is not None or info.operation.operation != OperationType.MUTATION:
+            return next(root, info, **kwargs)
+
+        field = info.field_name
+        bucket = self.buckets.get(field, self.default_bucket)
+        if bucket is not None:
+            retry_after = bucket.take(f"graphql-ratelimit:{field}:{client_identity(info.context)}")
+            if retry_after:
+                raise GraphQLError(
+                    f"Rate limit exceeded for {field}, retry in {retry_after:.1f}s",
+                    extensions={"code": "RATE_LIMITED", "retryAfter": round(retry_after, 1)},
+                )
+
+        if not self.shedder.acquire():
+            raise GraphQLError(
+                "Server is busy, please retry shortly",
+                extensions={"code": "OVERLOADED"},
+            )
+        # only database time: password hashing in tokenAuth or registerUser
+        # is slow but doesn't mean the database is overloaded
+        timer = QueryTimer()
+        try:
+            with connection.execute_wrapper(timer):
+                return next(root, info, **kwargs)
+        finally:
+            self.shedder.release(timer.elapsed if timer.queries else None)
@@ -3,8 +3,17 @@ import graphql_jwt
 import users.schema
 import posts.schema
 from users.schema import LoginUserBuiltIn
+from social_media_api import profiling
 class Query(users.schema.Query, posts.schema.Query, graphene.ObjectType):
-    pass
+    profile_token = graphene.String(
+        description="X-GraphQL-Profile header value that profiles the requests sending it (staff only)"
+    )
+
+    def resolve_profile_token(self, info):
+        user = info.context.user
+        if not user.is_authenticated or not user.is_staff:
+            raise Exception("Staff only")
+        return profiling.make_token(user)
 
 class Mutation(users.schema.Mutation, posts.schema.Mutation, graphene.ObjectType):
     # JWT mutations
@@ -13,4 +22,7 @@ class Mutation(users.schema.Mutation, posts.schema.Mutation, graphene.ObjectType
     refresh_token = graphql_jwt.Refresh.Field()
     login_user = LoginUserBuiltIn.Field()
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+class Subscription(posts.schema.Subscription, graphene.ObjectType):
+    pass
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
\ No newline at end of file
@@ -41,11 +41,14 @@ INSTALLED_APPS = [
     "django_filters",
     'users',
     'posts',
+    'jobs',
 ]
 
 GRAPHENE = {
     "SCHEMA": "social_media_api.schema.schema",  # global schema file
     "MIDDLEWARE": [
+        # listed first so the JWT middleware wraps it and the user is known
+        "social_media_api.ratelimit.RateLimitMiddleware",
         "graphql_jwt.middleware.JSONWebTokenMiddleware",
     ],
 }
@@ -128,6 +131,31 @@ DATABASES = {
 }
 
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # state all processes must agree on: rate limit buckets and the write
+    # rate of hot posts. The database cache works everywhere (a posts
+    # migration creates its table); Redis or Memcached are faster.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+    # stored mutation results for idempotency keys; bounded and TTL'd. A
+    # retry can reach any process, so this must be shared: the database
+    # cache works everywhere (a posts migration creates its table), Redis or
+    # Memcached are faster. A per-process cache would re-run the mutation.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'idempotency_cache',
+        'TIMEOUT': 24 * 3600,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -164,8 +192,100 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (profile images and their resized variants)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = "users.User"
+
+# Raw interactions older than this many days can be moved to
+# ArchivedInteraction with `manage.py archive_interactions`. Daily rollups
+# keep the analytics; None disables archiving.
+INTERACTION_RETENTION_DAYS = None
+
+# GraphQL subscriptions (served over WebSockets by asgi.py): counter updates
+# for one post published within this window are collapsed into one message,
+# and each subscriber buffers at most GRAPHQL_SUBSCRIPTION_QUEUE_SIZE messages.
+GRAPHQL_SUBSCRIPTION_COALESCE_SECONDS = 0.5
+GRAPHQL_SUBSCRIPTION_QUEUE_SIZE = 100
+
+# changesSince only returns posts stamped at least this many seconds ago, so
+# a change from a transaction still in flight is never skipped.
+CHANGES_SINCE_SETTLE_SECONDS = 2
+
+# /graphql/ responses: dotted path to a callable turning the result dict into
+# bytes (None picks orjson when installed, else the stdlib encoder), and
+# gzip/brotli compression for bodies of at least GRAPHQL_COMPRESS_MIN_BYTES.
+GRAPHQL_JSON_ENCODER = None
+GRAPHQL_COMPRESS_MIN_BYTES = 1024
+
+# Mutation rate limits per user (or client IP when anonymous), as
+# "<count>/<s|m|h|d>"; "default" applies to mutations not listed.
+GRAPHQL_RATE_LIMITS = {
+    "default": "60/m",
+    "registerUser": "5/h",
+    "tokenAuth": "10/m",
+    "createPost": "30/m",
+    "addComment": "60/m",
+    "interactWithPost": "120/m",
+}
+GRAPHQL_RATE_LIMIT_CACHE = "shared"  # not LocMemCache, which is per process
+GRAPHQL_RATE_LIMIT_TRUST_X_FORWARDED_FOR = False  # only behind a trusted proxy
+
+# Load shedding, per process: at most this many mutations run at once, and
+# only GRAPHQL_MUTATION_OVERLOADED_IN_FLIGHT while the smoothed time their
+# database queries take is above the budget. Anything beyond that is rejected straight away.
+GRAPHQL_MUTATION_MAX_IN_FLIGHT = 32
+GRAPHQL_MUTATION_OVERLOADED_IN_FLIGHT = 4
+GRAPHQL_MUTATION_LATENCY_BUDGET_MS = 500
+
+# Idempotency-Key handling for CreatePost/AddComment: results are kept for
+# IDEMPOTENCY_TTL_SECONDS, and a duplicate waits up to IDEMPOTENCY_WAIT_SECONDS
+# for the first execution to finish.
+IDEMPOTENCY_CACHE = "idempotency"
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_WAIT_SECONDS = 10
+
+# Opt-in profiling of /graphql/ requests (social_media_api/profiling.py):
+# requests with a valid X-GraphQL-Profile header from the profileToken query
+# (good for GRAPHQL_PROFILE_TOKEN_MAX_AGE seconds), plus a random
+# GRAPHQL_PROFILE_SAMPLE_RATE fraction of all requests, are sampled every
+# GRAPHQL_PROFILE_INTERVAL_MS and written to GRAPHQL_PROFILE_DIR. None turns
+# profiling off.
+GRAPHQL_PROFILE_DIR = BASE_DIR / 'profiles'
+GRAPHQL_PROFILE_SAMPLE_RATE = 0
+GRAPHQL_PROFILE_INTERVAL_MS = 5
+GRAPHQL_PROFILE_TOKEN_MAX_AGE = 3600
+
+# Background jobs (`python manage.py run_workers`). With JOBS_EAGER the
+# handlers run inline after commit instead of being queued. A RUNNING job
+# whose worker hasn't finished it within JOBS_LEASE_SECONDS is claimed again.
+JOBS_EAGER = False
+JOBS_LEASE_SECONDS = 300
+
+# Profile images are resized into one square variant per size (pixels) by a
+# background job; `profileImage(size: SMALL)` serves them. Variant names
+# change with the image, so they are served with MEDIA_VARIANT_MAX_AGE;
+# originals keep a short MEDIA_MAX_AGE.
+PROFILE_IMAGE_SIZES = {"small": 48, "medium": 96, "large": 256}
+PROFILE_IMAGE_FORMAT = "WEBP"
+MEDIA_MAX_AGE = 3600
+MEDIA_VARIANT_MAX_AGE = 365 * 24 * 3600
+
+# Sharded counters for hot posts (posts/counters.py). A post taking
+# POST_COUNTER_HOT_WRITES likes/shares/comments within the window spreads
+# its counter writes over POST_COUNTER_SHARDS rows; the shards are folded
+# back every POST_COUNTER_FOLD_SECONDS. None disables automatic sharding.
+# The write rate is tracked in POST_COUNTER_CACHE, which every process must
+# share.
+POST_COUNTER_SHARDS = 8
+POST_COUNTER_CACHE = "shared"
+POST_COUNTER_HOT_WRITES = 100
+POST_COUNTER_HOT_WINDOW_SECONDS = 10
+POST_COUNTER_FOLD_SECONDS = 30
+POST_COUNTER_READ_CACHE_SECONDS = 1
+POST_COUNTER_TOUCH_SECONDS = 1
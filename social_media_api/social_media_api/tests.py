@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from graphql import GraphQLError
+from graphql_jwt.shortcuts import get_token
+
+from posts.models import Post
+from posts.schema import CreatePost
+from .idempotency import IdempotencyStore, dump_payload, load_payload
+from .ratelimit import LoadShedder, QueryTimer, RateLimitMiddleware, TokenBucket
+
+User = get_user_model()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.bucket = TokenBucket(LocMemCache(uuid.uuid4().hex, {}), capacity=2, period=10)
+
+    def test_denied_when_empty(self):
+        self.assertEqual(self.bucket.take("k", now=100), 0)
+        self.assertEqual(self.bucket.take("k", now=100), 0)
+        self.assertAlmostEqual(self.bucket.take("k", now=100), 5)
+        # buckets are per key
+        self.assertEqual(self.bucket.take("other", now=100), 0)
+
+    def test_refills_over_time(self):
+        for _ in range(2):
+            self.bucket.take("k", now=100)
+        self.assertAlmostEqual(self.bucket.take("k", now=103), 2)
+        self.assertEqual(self.bucket.take("k", now=105), 0)
+        self.assertGreater(self.bucket.take("k", now=105), 0)
+        # never refills past capacity
+        self.assertEqual(self.bucket.take("k", now=1000), 0)
+        self.assertEqual(self.bucket.take("k", now=1000), 0)
+        self.assertGreater(self.bucket.take("k", now=1000), 0)
+
+    def test_denied_while_another_request_holds_the_bucket(self):
+        self.bucket.cache.add("k:lock", 1)
+        self.assertEqual(self.bucket.take("k", now=100), self.bucket.lock_wait)
+
+    @override_settings(GRAPHQL_RATE_LIMIT_CACHE="default")
+    def test_per_process_cache_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            RateLimitMiddleware()
+
+
+class LoadShedderTests(SimpleTestCase):
+    def setUp(self):
+        self.shedder = LoadShedder(max_in_flight=3, overloaded_in_flight=1, latency_budget=0.1, smoothing=0.5)
+
+    def acquire_all(self):
+        acquired = 0
+        while self.shedder.acquire():
+            acquired += 1
+        for _ in range(acquired):
+            self.shedder.release()
+        return acquired
+
+    def test_overload_lowers_the_cap_until_db_time_recovers(self):
+        self.assertEqual(self.acquire_all(), 3)
+
+        for _ in range(3):
+            self.shedder.acquire()
+            self.shedder.release(0.5)
+        self.assertTrue(self.shedder.overloaded)
+        self.assertEqual(self.acquire_all(), 1)
+
+        # mutations without queries don't move the average
+        self.shedder.acquire()
+        self.shedder.release(None)
+        self.assertTrue(self.shedder.overloaded)
+
+        for _ in range(5):
+            self.shedder.acquire()
+            self.shedder.release(0.01)
+        self.assertFalse(self.shedder.overloaded)
+        self.assertEqual(self.acquire_all(), 3)
+
+
+class QueryTimerTests(TestCase):
+    def test_counts_only_query_time(self):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            User.objects.exists()
+            User.objects.count()
+            time.sleep(0.05)
+        self.assertEqual(timer.queries, 2)
+        self.assertLess(timer.elapsed, 0.05)
+
+
+class IdempotencyStoreTests(SimpleTestCase):
+    def make_store(self, wait_timeout=5):
+        return IdempotencyStore(
+            # locmem caches with the same name share storage
+            LocMemCache(uuid.uuid4().hex, {}), ttl=60, wait_timeout=wait_timeout, poll_interval=0.01
+        )
+
+    def test_replay_returns_the_stored_payload(self):
+        store = self.make_store()
+        calls = []
+
+        def execute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(store.run("k", "f", execute), 1)
+        self.assertEqual(store.run("k", "f", execute), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_reuse_with_different_arguments_is_rejected(self):
+        store = self.make_store()
+        store.run("k", "f", lambda: 1)
+        with self.assertRaises(GraphQLError) as raised:
+            store.run("k", "other", lambda: 2)
+        self.assertEqual(raised.exception.extensions["code"], "IDEMPOTENCY_KEY_REUSED")
+
+    def test_failures_are_not_stored(self):
+        store = self.make_store()
+
+        def fail():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            store.run("k", "f", fail)
+        self.assertEqual(store.run("k", "f", lambda: 2), 2)
+
+    def test_concurrent_duplicate_waits_for_the_first(self):
+        store = self.make_store()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        results = {}
+
+        def slow():
+            calls.append("first")
+            started.set()
+            release.wait(5)
+            return "first result"
+
+        first = threading.Thread(target=lambda: results.setdefault("first", store.run("k", "f", slow)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(
+            target=lambda: results.setdefault("second", store.run("k", "f", lambda: calls.append("second")))
+        )
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(calls, ["first"])
+        self.assertEqual(results, {"first": "first result", "second": "first result"})
+
+    def test_duplicate_in_another_process_waits_on_the_cache_lock(self):
+        store = self.make_store()
+        # another process holds the lock and stores its result shortly
+        store.cache.add("k:lock", 1)
+        timer = threading.Timer(0.05, lambda: store.cache.set("k:result", ("f", "theirs")))
+        timer.start()
+        self.assertEqual(store.run("k", "f", lambda: "ours"), "theirs")
+        timer.join()
+
+    def test_gives_up_waiting_after_the_timeout(self):
+        store = self.make_store(wait_timeout=0.05)
+        store.cache.add("k:lock", 1)
+        with self.assertRaises(GraphQLError) as raised:
+            store.run("k", "f", lambda: "ours")
+        self.assertEqual(raised.exception.extensions["code"], "IDEMPOTENCY_IN_PROGRESS")
+
+
+class IdempotentMutationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="alice@example.com", username="alice", password="pw")
+
+    def create_post(self, content, key):
+        response = self.client.post(
+            "/graphql/",
+            json.dumps({"query": "mutation($c: String!) { createPost(content: $c) { post { id } } }",
+                        "variables": {"c": content}}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"JWT {get_token(self.user)}",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+        return response.json()
+
+    def test_retried_create_post_runs_once(self):
+        first = self.create_post("hello", "retry-1")
+        second = self.create_post("hello", "retry-1")
+        self.assertEqual(first, second)
+        self.assertEqual(Post.objects.count(), 1)
+
+        self.assertNotIn("errors", self.create_post("hello", "retry-2"))
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_key_reused_with_other_content(self):
+        self.create_post("hello", "retry-1")
+        result = self.create_post("goodbye", "retry-1")
+        self.assertEqual(result["errors"][0]["extensions"]["code"], "IDEMPOTENCY_KEY_REUSED")
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_only_ids_are_stored(self):
+        post = Post.objects.create(author=self.user, content="hello")
+        stored = dump_payload(CreatePost(post=post))
+        self.assertEqual(stored, (CreatePost, {}, {"post": ("posts.Post", post.pk)}))
+        self.assertEqual(load_payload(stored).post, post)
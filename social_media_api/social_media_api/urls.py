@@ -14,15 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from graphene_django.views import GraphQLView
+from social_media_api.views import FastGraphQLView, serve_media
 from django.views.decorators.csrf import csrf_exempt
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql/", csrf_exempt(FastGraphQLView.as_view(graphiql=True))),
 ]
+
+if settings.DEBUG:
+    # in production the web server or CDN serves MEDIA_ROOT with these headers
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media),
+    ]
@@ -0,0 +1,150 @@
+import functools
+import gzip
+import hashlib
+import json
+import random
+import re
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.module_loading import import_string
+from django.views.static import serve
+from graphene_django.views import GraphQLView
+
+from users.images import is_variant_name
+from . import profiling
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+
+def stdlib_json_encoder(data):
+    return json.dumps(data, separators=(",", ":"), cls=DjangoJSONEncoder).encode()
+
+
+def orjson_encoder(data):
+    # orjson serializes UUIDs and datetimes natively and returns bytes
+    return orjson.dumps(data)
+
+
+def default_json_encoder(data):
+    return orjson_encoder(data) if orjson is not None else stdlib_json_encoder(data)
+
+
+def get_json_encoder():
+    encoder = getattr(settings, "GRAPHQL_JSON_ENCODER", None)
+    if encoder is None:
+        return default_json_encoder
+    return import_string(encoder) if isinstance(encoder, str) else encoder
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts, ignoring those sent with q=0."""
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if re.match(r"\s*q\s*=\s*0(\.0*)?\s*$", params):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(content, encodings):
+    """Return (coding, body) for the best coding both sides support, else (None, content)."""
+    if brotli is not None and "br" in encodings:
+        return "br", brotli.compress(content, quality=getattr(settings, "GRAPHQL_BROTLI_QUALITY", 5))
+    if "gzip" in encodings:
+        return "gzip", gzip.compress(content, compresslevel=getattr(settings, "GRAPHQL_GZIP_LEVEL", 6))
+    return None, content
+
+
+class FastGraphQLView(GraphQLView):
+    """
+    GraphQLView with a pluggable JSON encoder (GRAPHQL_JSON_ENCODER, orjson
+    when installed), ETag revalidation for GET queries and gzip/brotli
+    compression of responses above GRAPHQL_COMPRESS_MIN_BYTES, and opt-in
+    profiling of single requests (see profiling.py).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encode = get_json_encoder()
+        self.compress_min_bytes = getattr(settings, "GRAPHQL_COMPRESS_MIN_BYTES", 1024)
+        self.profile_dir = getattr(settings, "GRAPHQL_PROFILE_DIR", None)
+        self.profile_sample_rate = getattr(settings, "GRAPHQL_PROFILE_SAMPLE_RATE", 0)
+
+    def should_profile(self, request):
+        if self.profile_dir is None:
+            return False
+        token = request.META.get(profiling.HEADER)
+        if token is not None:
+            return profiling.token_is_valid(token)
+        return bool(self.profile_sample_rate) and random.random() < self.profile_sample_rate
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, *args, **kwargs):
+        execute = functools.partial(
+            super().execute_graphql_request, request, data, query, variables, operation_name, *args, **kwargs
+        )
+        if not query or not self.should_profile(request):
+            return execute()
+        result, name = profiling.profile(request, execute, query, variables, operation_name)
+        # batched requests profile each operation
+        request.graphql_profiles = getattr(request, "graphql_profiles", []) + [name]
+        return result
+
+    def json_encode(self, request, d, pretty=False):
+        if self.pretty or pretty or request.GET.get("pretty"):
+            return super().json_encode(request, d, pretty=True)
+        return self.encode(d)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if profiling.HEADER in request.META and hasattr(request, "graphql_profiles"):
+            # sampled requests aren't told they were profiled
+            response["X-GraphQL-Profile"] = ", ".join(request.graphql_profiles)
+        if response.streaming or not response.get("Content-Type", "").startswith("application/json"):
+            return response  # GraphiQL page or an error raised before execution
+
+        # Results depend on who is asking
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+
+        if request.method == "GET" and response.status_code == 200:
+            # Weak because the same result is served with different codings
+            response["ETag"] = 'W/"%s"' % hashlib.blake2b(response.content, digest_size=16).hexdigest()
+            response["Cache-Control"] = "private, no-cache"
+            conditional = get_conditional_response(request, etag=response["ETag"], response=response)
+            if conditional is not response:
+                return conditional
+
+        if len(response.content) >= self.compress_min_bytes:
+            coding, body = compress(response.content, accepted_encodings(request))
+            if coding is not None and len(body) < len(response.content):
+                response.content = body
+                response["Content-Encoding"] = coding
+                response["Content-Length"] = str(len(body))
+            patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+def serve_media(request, path):
+    """
+    Development server for MEDIA_ROOT with the cache headers production
+    should use. Resized variants are content-addressed, so they never change
+    under the same URL.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code == 200:
+        if is_variant_name(path):
+            max_age = getattr(settings, "MEDIA_VARIANT_MAX_AGE", 365 * 24 * 3600)
+            patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, "MEDIA_MAX_AGE", 3600))
+    return response
@@ -0,0 +1,139 @@
+"""
+Minimal GraphQL-over-WebSocket ASGI app speaking the graphql-transport-ws
+protocol (https://github.com/enisdenjo/graphql-ws/blob/master/PROTOCOL.md),
+so clients can subscribe instead of polling /graphql/.
+"""
+import asyncio
+import json
+import logging
+
+from graphql import ExecutionResult
+
+GRAPHQL_TRANSPORT_WS = "graphql-transport-ws"
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionContext:
+    """Context handed to subscription resolvers in place of an HttpRequest."""
+
+    def __init__(self, scope, connection_params):
+        self.scope = scope
+        self.connection_params = connection_params or {}
+        self.META = {}
+        self.user = None
+
+
+class GraphQLWebSocketApp:
+    def __init__(self, schema):
+        self.schema = schema
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket":
+            raise ValueError("GraphQLWebSocketApp only handles websocket connections")
+        await GraphQLWebSocketConnection(self.schema, scope, receive, send).run()
+
+
+class GraphQLWebSocketConnection:
+    def __init__(self, schema, scope, receive, send):
+        self.schema = schema
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.context = None
+        self.operations = {}
+
+    async def run(self):
+        message = await self.receive()
+        if message["type"] != "websocket.connect":
+            return
+        if GRAPHQL_TRANSPORT_WS not in self.scope.get("subprotocols", []):
+            await self.send({"type": "websocket.close", "code": 4406})
+            return
+        await self.send({"type": "websocket.accept", "subprotocol": GRAPHQL_TRANSPORT_WS})
+
+        try:
+            while True:
+                message = await self.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message["type"] == "websocket.receive":
+                    closed = await self.handle(message.get("text") or message.get("bytes"))
+                    if closed:
+                        break
+        finally:
+            tasks = list(self.operations.values())
+            for task in tasks:
+                task.cancel()
+            # let the subscription generators run their cleanup
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send_json(self, data):
+        await self.send({"type": "websocket.send", "text": json.dumps(data, default=str)})
+
+    async def close(self, code, reason):
+        await self.send({"type": "websocket.close", "code": code, "reason": reason})
+        return True
+
+    async def handle(self, raw):
+        try:
+            message = json.loads(raw)
+            message_type = message["type"]
+        except (TypeError, ValueError, KeyError):
+            return await self.close(4400, "Invalid message")
+
+        if message_type == "connection_init":
+            if self.context is not None:
+                return await self.close(4429, "Too many initialisation requests")
+            self.context = SubscriptionContext(self.scope, message.get("payload"))
+            await self.send_json({"type": "connection_ack"})
+        elif message_type == "ping":
+            await self.send_json({"type": "pong"})
+        elif message_type == "pong":
+            pass
+        elif message_type == "subscribe":
+            if self.context is None:
+                return await self.close(4401, "Unauthorized")
+            operation_id = message.get("id")
+            if operation_id in self.operations:
+                return await self.close(4409, f"Subscriber for {operation_id} already exists")
+            self.operations[operation_id] = asyncio.create_task(
+                self.run_operation(operation_id, message.get("payload") or {})
+            )
+        elif message_type == "complete":
+            task = self.operations.pop(message.get("id"), None)
+            if task is not None:
+                task.cancel()
+        else:
+            return await self.close(4400, f"Unknown message type {message_type!r}")
+        return False
+
+    async def run_operation(self, operation_id, payload):
+        try:
+            result = await self.schema.subscribe(
+                payload.get("query") or "",
+                variable_values=payload.get("variables"),
+                operation_name=payload.get("operationName"),
+                context_value=self.context,
+            )
+            if isinstance(result, ExecutionResult):
+                # parse/validation errors, or a query sent as a subscription
+                await self.send_json({
+                    "id": operation_id,
+                    "type": "error",
+                    "payload": [error.formatted for error in result.errors or []],
+                })
+                return
+            try:
+                async for item in result:
+                    await self.send_json({"id": operation_id, "type": "next", "payload": item.formatted})
+            except Exception as error:
+                # the source stream failed; the error ends the operation
+                logger.warning("Subscription %s failed", operation_id, exc_info=True)
+                await self.send_json({"id": operation_id, "type": "error", "payload": [{"message": str(error)}]})
+                return
+            finally:
+                await result.aclose()
+            await self.send_json({"id": operation_id, "type": "complete"})
+        finally:
+            self.operations.pop(operation_id, None)
@@ -1,17 +1,25 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from posts.admin import ScalableAdminMixin, SoftDeleteAdminMixin
+from posts.purge import soft_delete_users
 from .models import User
 
-class UserAdmin(BaseUserAdmin):
-    ordering = ["id"]
+class UserAdmin(SoftDeleteAdminMixin, ScalableAdminMixin, BaseUserAdmin):
+    ordering = ["-date_joined"]
+    keyset_field = "date_joined"
     list_display = ["email", "username", "is_staff", "is_active"]
-    search_fields = ["email", "username"]
+    list_filter = BaseUserAdmin.list_filter + (("deleted_at", admin.EmptyFieldListFilter),)
+    # exact matches use the unique indexes
+    search_fields = ["email__exact", "username__exact"]
+    search_help_text = "Exact email or username"
+    readonly_fields = ("deleted_at",)
+    soft_delete = staticmethod(soft_delete_users)
 
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         ("Personal Info", {"fields": ("username", "full_name", "bio", "profile_image", "date_of_birth")}),
         ("Permissions", {"fields": ("is_active", "is_staff", "is_superuser", "groups", "user_permissions")}),
-        ("Important dates", {"fields": ("last_login", "date_joined")}),
+        ("Important dates", {"fields": ("last_login", "date_joined", "deleted_at")}),
     )
 
     add_fieldsets = (
@@ -0,0 +1,100 @@
+"""
+Resized variants of profile images.
+
+Each upload is turned into one square, re-encoded image per size in
+PROFILE_IMAGE_SIZES, stored next to the original:
+
+    profile_images/me.jpg -> profile_images/me.96.3f2a9c1e.webp
+
+The variant name includes a hash of the original's bytes, so a URL never
+changes meaning and can be cached forever. Users keep serving the original
+until their variants are ready.
+"""
+import hashlib
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DEFAULT_SIZES = {"small": 48, "medium": 96, "large": 256}
+VARIANT_NAME_RE = re.compile(r"\.\d+\.[0-9a-f]{8}\.\w+$")
+
+
+def profile_image_sizes():
+    return getattr(settings, "PROFILE_IMAGE_SIZES", DEFAULT_SIZES)
+
+
+def image_format():
+    return getattr(settings, "PROFILE_IMAGE_FORMAT", "WEBP")
+
+
+def variant_name(source, digest, pixels):
+    root, _ = os.path.splitext(source)
+    return f"{root}.{pixels}.{digest[:8]}.{image_format().lower()}"
+
+
+def is_variant_name(name):
+    return VARIANT_NAME_RE.search(name) is not None
+
+
+def render_variant(image, pixels):
+    variant = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    fmt = image_format()
+    if fmt == "JPEG":
+        variant.convert("RGB").save(out, fmt, quality=85, optimize=True, progressive=True)
+    else:
+        variant.save(out, fmt, quality=80, method=4)
+    return out.getvalue()
+
+
+def make_variants(source):
+    """
+    Write every configured variant of the stored image source and return
+    {"source": source, "sizes": {"<pixels>": "<storage name>"}}.
+    """
+    with default_storage.open(source, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)  # phones store rotation in EXIF
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    sizes = {}
+    for pixels in sorted(set(profile_image_sizes().values())):
+        name = variant_name(source, digest, pixels)
+        # same bytes, same name: a rerun can keep what it already wrote
+        if not default_storage.exists(name):
+            saved = default_storage.save(name, ContentFile(render_variant(image, pixels)))
+            # storages rename on collision; keep whatever name we got
+            name = saved
+        sizes[str(pixels)] = name
+    return {"source": source, "sizes": sizes}
+
+
+def delete_variants(variants, keep=()):
+    for name in variants.get("sizes", {}).values():
+        if name not in keep:
+            default_storage.delete(name)
+
+
+def profile_image_url(user, size=None):
+    """
+    URL of user's profile image at the named size (see PROFILE_IMAGE_SIZES),
+    or of the original when size is None or its variant isn't ready yet.
+    """
+    if not user.profile_image:
+        return None
+    if size is not None:
+        variants = user.profile_image_variants or {}
+        pixels = profile_image_sizes().get(size)
+        name = variants.get("sizes", {}).get(str(pixels))
+        if name and variants.get("source") == user.profile_image.name:
+            return default_storage.url(name)
+    return user.profile_image.url
@@ -0,0 +1,23 @@
+"""Background job handlers for users, run by `manage.py run_workers`."""
+from django.db.models import Q
+
+from jobs.api import job
+
+from .images import delete_variants, make_variants
+from .models import User
+
+
+@job("users.profile_image_variants", max_attempts=3)
+def profile_image_variants(user_id, source):
+    """Build the variants of source, or drop the old ones if source is ""."""
+    user = User.objects.filter(pk=user_id).only("profile_image", "profile_image_variants").first()
+    if user is None or (user.profile_image.name or "") != source:
+        return  # deleted or replaced since; a newer job handles the new image
+    old = user.profile_image_variants or {}
+    variants = make_variants(source) if source else {}
+    # only record them if the image didn't change while we were resizing
+    unchanged = Q(profile_image=source) if source else Q(profile_image="") | Q(profile_image__isnull=True)
+    if not User.objects.filter(unchanged, pk=user_id).update(profile_image_variants=variants):
+        delete_variants(variants)
+        return
+    delete_variants(old, keep=set(variants.get("sizes", {}).values()))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from jobs.api import enqueue
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue resized variants for every profile image that doesn't have "
+        "them yet, e.g. uploads from before thumbnails or after changing "
+        "PROFILE_IMAGE_SIZES (use --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true",
+                            help="Rebuild variants even where they already exist")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = (
+            User.objects.exclude(profile_image="").exclude(profile_image__isnull=True)
+            .only("id", "profile_image", "profile_image_variants").order_by("id")
+        )
+        last_id = None
+        queued = 0
+        while True:
+            batch = users if last_id is None else users.filter(id__gt=last_id)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            for user in batch:
+                source = user.profile_image.name
+                if options["all"] or (user.profile_image_variants or {}).get("source") != source:
+                    enqueue(
+                        "users.profile_image_variants",
+                        {"user_id": str(user.pk), "source": source},
+                        dedupe_key=f"users.profile_image_variants:{user.pk}:{source}",
+                    )
+                    queued += 1
+            last_id = batch[-1].id
+            self.stdout.write(f"Queued {queued} users so far")
+
+        self.stdout.write(self.style.SUCCESS(f"Queued variants for {queued} users; run_workers builds them"))
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import (
     AbstractBaseUser, 
     PermissionsMixin, 
@@ -41,18 +42,52 @@ class User(AbstractBaseUser, PermissionsMixin):
     full_name = models.CharField(max_length=150, blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
     profile_image = models.ImageField(upload_to="profile_images/", blank=True, null=True)
+    # resized copies built by a background job, see users/images.py
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     date_of_birth = models.DateField(blank=True, null=True)
 
+    # denormalized stats, kept up to date by the post mutations and checked
+    # by `manage.py reconcile_counters`
+    posts_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    likes_received_count = models.IntegerField(default=0)
+
     # Django required fields
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
+    # set by soft deletion (which also deactivates the account); the user
+    # and everything they wrote are purged later
+    deleted_at = models.DateTimeField(blank=True, null=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
+    class Meta:
+        indexes = [
+            # newest-first admin list
+            models.Index(fields=["-date_joined"], name="users_user_joined_idx"),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="users_user_deleted_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.username
 
+    def bump_counters(self, **deltas):
+        """
+        Atomically add deltas to the denormalized stats, e.g.
+        user.bump_counters(posts_count=1). The in-memory values are adjusted
+        to match.
+        """
+        User.objects.filter(pk=self.pk).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        for field, delta in deltas.items():
+            setattr(self, field, getattr(self, field) + delta)
+
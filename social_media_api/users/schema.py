@@ -2,8 +2,8 @@ import graphene
 from graphene_django.types import DjangoObjectType
 from django.contrib.auth import get_user_model
 from .models import User
+from .images import profile_image_sizes, profile_image_url
 import logging
-import traceback
 from django.db import transaction
 import graphql_jwt
 from graphql_jwt import ObtainJSONWebToken
@@ -11,8 +11,16 @@ from graphql_jwt import ObtainJSONWebToken
 
 UserModel = get_user_model()
 
+ProfileImageSize = graphene.Enum(
+    "ProfileImageSize", [(name.upper(), name) for name in profile_image_sizes()]
+)
+
+
 class UserType(DjangoObjectType):
     id = graphene.String()
+    # URL of a resized variant, or of the original when size is omitted
+    profile_image = graphene.String(size=ProfileImageSize())
+
     class Meta:
         model = UserModel
         fields = (
@@ -22,9 +30,15 @@ class UserType(DjangoObjectType):
             "full_name", 
             "bio", 
             "profile_image", 
-            "date_of_birth"
+            "date_of_birth",
+            "posts_count",
+            "comments_count",
+            "likes_received_count",
         )
 
+    def resolve_profile_image(self, info, size=None):
+        return profile_image_url(self, size.value if size else None)
+
 #  Queries 
 class Query(graphene.ObjectType):
     me = graphene.Field(UserType)
@@ -46,44 +60,27 @@ class RegisterUser(graphene.Mutation):
         password = graphene.String(required=True)
 
     def mutate(self, info, email, username, password):
-        logger.info(f"=== DEBUGGING USER CREATION ===")
-        logger.info(f"Input - Email: {email} (type: {type(email)})")
-        logger.info(f"Input - Username: {username} (type: {type(username)})")
-        logger.info(f"Input - Password length: {len(password) if password else 0}")
-        
         try:
-            # Test 1: Check if user already exists
             if User.objects.filter(email=email).exists():
                 raise Exception("User with this email already exists")
-            
+
             if User.objects.filter(username=username).exists():
                 raise Exception("User with this username already exists")
-            
-            # Test 2: Try creating user step by step
-            logger.info("Creating user...")
-            
-            # Method 1: Use transaction to catch database errors
+
             with transaction.atomic():
                 user = User.objects.create_user(
                     email=email,
                     username=username,
                     password=password,
-                    #info=info,
-                   # full_name=full_name
                 )
-                logger.info(f"User created successfully: {user.id}")
-                return RegisterUser(user=user)
-                
+            logger.info("User registered: %s (%s)", user.username, user.pk)
+            return RegisterUser(user=user)
+
         except Exception as e:
-            logger.error(f"Full error details:")
-            logger.error(f"Error message: {str(e)}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error module: {type(e).__module__}")
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            
-            # Re-raise with more specific error
+            logger.info("User registration failed: %s", e)
             raise Exception(f"User creation failed: {str(e)}")
-    
+
+
 class LoginUserBuiltIn(ObtainJSONWebToken):
     """
     Using the built-in ObtainJSONWebToken mutation
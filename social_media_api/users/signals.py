@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from jobs.api import enqueue
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def queue_profile_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "profile_image" not in update_fields:
+        return  # e.g. the last_login update on every login
+    source = instance.profile_image.name or ""
+    variants = instance.profile_image_variants or {}
+    if variants.get("source", "") == source:
+        return
+    enqueue(
+        "users.profile_image_variants",
+        {"user_id": str(instance.pk), "source": source},
+        dedupe_key=f"users.profile_image_variants:{instance.pk}:{source}",
+    )